@@ -1,13 +1,50 @@
+import numpy as np
 import igraph as ig
-from itertools import product, combinations
-from common import graph_cal, graph_load
+from itertools import combinations, islice
+from common import graph_cal, graph_load, profiler
+from common.comm_index import CommunityIndex
+from common.candidate_space import CandidateSpace
+from common.connectivity import ConnectivityOracle
+from common.worker_pool import WorkerPool
 from common.constant import BASE_WEIGHT
 
+def init_worker(group: ig.Graph, comm: ig.Graph) -> dict:
+    return {'group': group, 'comm': comm}
+
+
+def search_shard(state: dict, budget: int, conv_rate: float, shard: int, shards: int) -> (float, tuple, tuple, list):
+    brute_force = BruteForce(budget, conv_rate)
+    return brute_force.search(state['group'], state['comm'], shard, shards)
+
+
+def min_attraction(degree, num_v: int):
+    """ lower bound of attraction of vertices with degree in a connected group of num_v vertices
+
+    the edges of a bfs tree weigh at least as much as a path hanging below the direct edges.
+    """
+    rest = num_v - 1 - np.asarray(degree)
+    return graph_cal.INIT_WEIGHT * (degree + BASE_WEIGHT * (1 - np.power(BASE_WEIGHT, rest)) / (1 - BASE_WEIGHT))
+
+
+def max_safeness(degree, num_v: int) -> float:
+    """ upper bound of safeness of a connected group of num_v vertices with at least degree edges at each vertex
+
+    deleting edges lowers attraction and raises safeness, so it is bounded by the least attraction of the degrees.
+    """
+    return graph_cal.norm_safeness(float(np.mean(min_attraction(degree, num_v))), num_v)
+
+
+def best_out_score(top_out: np.ndarray, attraction) -> float:
+    """ max out score of adding top_out (descending) to distinct group vertices of attraction """
+    return float(np.sum(top_out / np.sort(np.atleast_1d(attraction))[:len(top_out)]))
+
 
 class BruteForce:
-    def __init__(self, budget: int, conv_rate: float):
+    def __init__(self, budget: int, conv_rate: float, processes: int = 1):
         self.budget = budget
         self.conv_rate = conv_rate
+        self.processes = processes  # shards of deletion sets searched in parallel
+        self.oracle = None  # connectivity oracle of the group being searched
 
     def cal_safeness_and_conv(self, del_ops: tuple, add_ops: tuple, group: ig.Graph, comm: ig.Graph):
         comm_add_vertices = [_[0] for _ in add_ops]
@@ -17,50 +54,118 @@ class BruteForce:
                 group_add_vertices):
             return "duplicated"
         # 2. check if del ops are valid
-        group_copy = group.copy()
-        for del_op in del_ops:
-            group_copy.delete_edges([del_op])
-        if group_copy.is_connected():
+        if ConnectivityOracle(group).is_connected_after_ops([('del', _) for _ in del_ops]):
             # if ops are valid, cal score
-            in_score = graph_cal.cal_safeness_of_graph(group_copy)
-            convenience = graph_cal.cal_convenience_of_graph(group_copy)
+            group_copy = group.copy()
+            group_copy.delete_edges(list(del_ops))
+            attraction, in_score, convenience = graph_cal.cal_group_metrics(group_copy)
             out_score = 0
             for add_op in add_ops:
                 g_v_name, c_v_name = add_op
-                in_attraction = graph_cal.cal_as_of_vertex(group_copy, g_v_name)
-                out_attraction = 1 + BASE_WEIGHT * comm.degree(c_v_name)
+                in_attraction = attraction[group_copy.vs.find(g_v_name).index]
+                out_attraction = CommunityIndex.of(comm).out_attraction(c_v_name)
                 out_score += (out_attraction / in_attraction)
             return in_score + out_score + self.conv_rate * convenience
         else:
             return 'unconnected'
 
+    @staticmethod
+    def canonical_key(num_v: int, edges: np.ndarray) -> tuple:
+        """ same key for isomorphic graphs, which share the same scores """
+        perm = ig.Graph(num_v, edges.tolist()).canonical_permutation()  # canonical label of vertex perm[i] is i
+        label = np.argsort(perm)
+        return tuple(sorted(map(tuple, np.sort(label[edges], axis=1).tolist())))
+
+    def extend_del_classes(self, num_v: int, edges: np.ndarray, del_classes: list) -> list:
+        """ non-isomorphic connected deletion sets with one more edge, from those of current size
+
+        if group - D is isomorphic to group - R by f, group - (D + e) is isomorphic to group - (R + f(e)),
+        so extending one deletion set of each class reaches all classes.
+        """
+        seen, next_classes = set(), []
+        for del_eids in del_classes:
+            for eid in range(len(edges)):
+                if eid in del_eids or not self.oracle.is_connected_after(del_eids + (eid,)):
+                    continue  # deleting more edges never reconnects the group
+                alive = np.ones(len(edges), dtype=bool)
+                alive[list(del_eids + (eid,))] = False
+                key = self.canonical_key(num_v, edges[alive])
+                if key not in seen:
+                    seen.add(key)
+                    next_classes.append(tuple(sorted(del_eids + (eid,))))
+        return next_classes
+
+    def search(self, group: ig.Graph, comm: ig.Graph, shard: int = 0, shards: int = 1) -> (float, tuple, tuple, list):
+        """ exact search on deletion sets of index % shards == shard, return (score, rank, del eids, add g_v_idx)
+
+        1. for a deletion set, the best k add ops pair the top k out attraction with the k least attractive
+           group vertices (rearrangement inequality), so add sets are never enumerated;
+        2. deletion sets whose upper bound can not beat the best score are pruned before bfs;
+        3. if group is symmetric, only one deletion set of each class of isomorphic remaining groups is searched.
+        """
+        num_v = group.vcount()
+        space = CandidateSpace(group, comm, self.budget)
+        self.oracle = ConnectivityOracle(group)
+        edges, degree = space.del_edges, np.array(group.degree())
+        _, _, convenience = graph_cal.cal_group_metrics(group, edges)
+        conv_bound = self.conv_rate * convenience  # deleting edges never raises closeness
+        symmetric = group.count_automorphisms() > 1
+        del_classes = [[()]]  # non-isomorphic deletion sets of each size, if group is symmetric
+        levels = []  # [(upper bound, add op num)]
+        for add_op_num in range(1, self.budget + 1):  # must have add op
+            if add_op_num <= min(num_v, len(space.c_top)) and self.budget - add_op_num <= len(edges):
+                # a vertex keeps at least one edge and loses at most one edge per deletion
+                min_degree = np.maximum(degree - (self.budget - add_op_num), 1)
+                bound = max_safeness(min_degree, num_v) + conv_bound + best_out_score(
+                    space.out_attraction[:add_op_num], min_attraction(min_degree, num_v))
+                levels.append((bound, add_op_num))
+        levels.sort(key=lambda _: -_[0])  # most promising first to prune more
+        best = (0, (len(levels),), (), [])
+        for level, (bound, add_op_num) in enumerate(levels):
+            if bound <= best[0]:
+                break
+            top_out, del_op_num = space.out_attraction[:add_op_num], self.budget - add_op_num
+            if symmetric:
+                while len(del_classes) <= del_op_num:
+                    del_classes.append(self.extend_del_classes(num_v, edges, del_classes[-1]))
+                del_ops_comb = del_classes[del_op_num]
+            else:
+                del_ops_comb = combinations(range(len(edges)), del_op_num)
+            for i, del_eids in enumerate(islice(del_ops_comb, shard, None, shards)):
+                if not self.oracle.is_connected_after(del_eids):
+                    continue
+                del_eids_array = np.array(del_eids, dtype=int)
+                del_degree = np.bincount(edges[del_eids_array].ravel(), minlength=num_v)
+                min_att = min_attraction(degree - del_degree, num_v)
+                if max_safeness(degree - del_degree, num_v) + conv_bound + best_out_score(top_out, min_att) <= best[0]:
+                    continue
+                alive = np.ones(len(edges), dtype=bool)
+                alive[del_eids_array] = False
+                attraction, in_score, convenience = graph_cal.cal_group_metrics(group, edges[alive])
+                score = in_score + self.conv_rate * convenience + best_out_score(top_out, attraction)
+                if score > best[0]:
+                    add_g_v = np.argsort(attraction, kind='stable')[:add_op_num].tolist()
+                    best = (score, (level, i * shards + shard), del_eids, add_g_v)
+        return best
+
     def run(self, group: ig.Graph, comm: ig.Graph):
         max_budget = group.vcount() + (group.ecount() - (group.vcount() - 1))  # max budget
         if self.budget > max_budget:
             self.budget = max_budget
-        # op_choice = ['add', 'del']
-        del_choice = [(group.vs[e.source]['name'], group.vs[e.target]['name']) for e in group.es]  # only existing edges
-        comm_top_vertices = [_[0] for _ in sorted([(_['name'], comm.degree(_)) for _ in comm.vs],
-                                                  key=lambda x: x[1], reverse=True)[:self.budget]]
-        add_choice = list(product(group.vs['name'], comm_top_vertices, repeat=1))  # [g_vs_name, c_vs_name]
-        best_score, best_ops = 0, ("del-ops", "add-ops")
-        # must have add op
-        for add_op_num in range(1, self.budget + 1):
-            add_ops_comb = list(combinations(add_choice, add_op_num))
-            del_ops_comb = list(combinations(del_choice, self.budget - add_op_num))
-            # search max score
-            for del_ops in del_ops_comb:
-                for add_ops in add_ops_comb:
-                    score = self.cal_safeness_and_conv(del_ops, add_ops, group, comm)
-                    if score not in ["unconnected", "duplicated"] and score > best_score:
-                        best_score = score
-                        best_ops = (del_ops, add_ops)
-            # print("# searching {} add ops is done".format(add_op_num))
-        # ops = [('del', _) for _ in best_ops[0] if len(best_ops[0])] + [
-        #     ('add', _) for _ in best_ops[1] if len(best_ops[1])]
-        # print("best ops: {}, best score: {}".format(ops, best_score))
-        return [('del', _) for _ in best_ops[0] if len(best_ops[0])] + [
-            ('add', _) for _ in best_ops[1] if len(best_ops[1])]
+        if self.processes == 1:
+            results = [self.search(group, comm)]
+        else:
+            args = [(self.budget, self.conv_rate, _, self.processes) for _ in range(self.processes)]
+            with WorkerPool(self.processes, init_worker, (group, comm)) as pool:
+                results = pool.map(search_shard, args)
+        # best score, ties broken by the enumeration order of a single process
+        best_score, _, del_eids, add_g_v = min(results, key=lambda _: (-_[0], _[1]))
+        space = CandidateSpace(group, comm, self.budget)
+        return [space.op(_) for _ in del_eids] + [
+            ('add', (space.g_names[g_v], space.c_names[i])) for i, g_v in enumerate(add_g_v)]
+
+
+profiler.register_phases(BruteForce, {'cal_safeness_and_conv': 'evaluation', 'extend_del_classes': 'validation'})
 
 
 if __name__ == '__main__':
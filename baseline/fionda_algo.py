@@ -1,84 +1,105 @@
 import random
+import numpy as np
 import igraph as ig
-from common import graph_load
+from common import graph_cal, graph_load, profiler
 
 
 class FlondaAlgo:
+    """ greedy on v_score = (|component of v| - in degree) / (n - 1) + out degree / (out degree + in degree)
+
+    a step keeps component labels, in degree and out degree arrays of group, and scores every candidate
+    deletion at once: deleting a non-bridge edge only changes the in degree of its two ends.
+    """
+
     def __init__(self, budget):
         self.budget = budget
+        self.scores = []  # g_score after each op
+
+    @staticmethod
+    def v_scores(comp_size: np.ndarray, in_degree: np.ndarray, out_degree: np.ndarray, num_v: int) -> np.ndarray:
+        return (comp_size - in_degree) / (num_v - 1) + out_degree / (out_degree + in_degree)
 
     @staticmethod
-    def v_score(g_after_del: ig.Graph, v_name: str, ops_series: list):
-        v_num = g_after_del.vcount()
-        g_add_vs = [_[1][0] for _ in ops_series if _[0] == 'add']  # add_op: ('add', (g_v_name, c_v_name))
-        v_in_degree = g_after_del.degree(v_name)
-        v_out_degree = g_add_vs.count(v_name)
-        v_score = (len(g_after_del.subcomponent(v_name)) - v_in_degree) / (v_num - 1) + v_out_degree / (
-                v_out_degree + v_in_degree)
-        return v_score
+    def state_of(group: ig.Graph) -> (np.ndarray, np.ndarray):
+        """ (component size, in degree) of each vertex """
+        membership = np.array(group.connected_components().membership)
+        return np.bincount(membership)[membership], np.array(group.degree())
 
-    def g_score(self, g_after_del: ig.Graph, ops_series: list):
-        g_score = 0
-        for v_name in g_after_del.vs['name']:
-            g_score += self.v_score(g_after_del, v_name, ops_series)
-        return g_score / g_after_del.vcount()
+    def g_score(self, group: ig.Graph, out_degree: np.ndarray) -> float:
+        return float(self.v_scores(*self.state_of(group), out_degree, group.vcount()).mean())
 
-    def best_add(self, group: ig.Graph, comm: ig.Graph, ops_series: list, curr_score: float):
+    def best_add(self, comp_size: np.ndarray, in_degree: np.ndarray, out_degree: np.ndarray,
+                 ops_series: list, g_names: list, c_names: list) -> (tuple, float):
+        num_v = len(g_names)
+        v_scores = self.v_scores(comp_size, in_degree, out_degree, num_v)
         # find v_p
-        v_p = min([(_, self.v_score(group, _, ops_series)) for _ in group.vs['name']], key=lambda x: x[1])[0]
+        p = int(np.argmin(v_scores))
+        v_p = g_names[p]
         # find v_t
         c_add_vs = [_[1][1] for _ in ops_series if _[0] == 'add' and _[1][0] == v_p]
         while True:
-            v_t = random.choice([_ for _ in comm.vs['name']])
+            v_t = random.choice(c_names)
             if v_t not in c_add_vs:
                 break
-        # cal add gain
-        ops_series.append(('add', (v_p, v_t)))
-        next_score = self.g_score(group, ops_series)
-        ops_series.pop()  # pop this op
-        return ('add', (v_p, v_t)), next_score - curr_score
+        # cal add gain: only the score of v_p changes
+        gain = self.v_scores(comp_size[p], in_degree[p], out_degree[p] + 1, num_v) - v_scores[p]
+        return ('add', (v_p, v_t)), float(gain) / num_v
 
-    def best_del(self, group: ig.Graph, ops_series: list, curr_score: float):
-        del_scores = []
-        for e in group.es:
-            v1, v2 = group.vs[e.source]['name'], group.vs[e.target]['name']
-            group.delete_edges([(v1, v2)])
-            if group.is_connected():
-                next_del_score = self.g_score(group, ops_series)
-                del_scores.append((('del', (v1, v2)), next_del_score - curr_score))
-            group.add_edge(v1, v2)  # add (v1, v2)) back
-        return max(del_scores, key=lambda x: x[1]) if len(del_scores) else (('no_del', (None, None)), -1)
+    def best_del(self, group: ig.Graph, comp_size: np.ndarray, in_degree: np.ndarray, out_degree: np.ndarray,
+                 g_names: list) -> (tuple, float):
+        if not group.is_connected():
+            return ('no_del', (None, None)), -1
+        edges = graph_cal.edge_array(group)
+        valid = np.ones(len(edges), dtype=bool)
+        valid[group.bridges()] = False  # deleting a bridge disconnects group
+        edges = edges[valid]
+        if not len(edges):
+            return ('no_del', (None, None)), -1
+        num_v = len(g_names)
+        v_scores = self.v_scores(comp_size, in_degree, out_degree, num_v)
+        gains = np.zeros(len(edges))
+        for end in (edges[:, 0], edges[:, 1]):
+            gains += self.v_scores(comp_size[end], in_degree[end] - 1, out_degree[end], num_v) - v_scores[end]
+        best = int(np.argmax(gains))
+        u, v = edges[best].tolist()
+        return ('del', (g_names[u], g_names[v])), float(gains[best]) / num_v
 
-    def run(self, group: ig.Graph, comm: ig.Graph):
+    def run(self, group: ig.Graph, comm: ig.Graph) -> (list, float):
+        """ return (ops, g_score after ops) with at most budget ops """
         max_budget = group.vcount() + (group.ecount() - (group.vcount() - 1))  # max budget
         if self.budget > max_budget:
             self.budget = max_budget
+        group = group.copy()  # in case group is modified
+        g_names, c_names = group.vs['name'], comm.vs['name']
+        out_degree = np.zeros(group.vcount(), dtype=int)
         ops_series = []
-        curr_score = self.g_score(group, ops_series)
-        print("curr score: {}".format(curr_score))
-        while True:
-            add_op, add_gain = self.best_add(group, comm, ops_series, curr_score)
-            del_op, del_gain = self.best_del(group, ops_series, curr_score)
+        curr_score = self.g_score(group, out_degree)
+        self.scores = [curr_score]
+        while len(ops_series) < self.budget:
+            comp_size, in_degree = self.state_of(group)
+            add_op, add_gain = self.best_add(comp_size, in_degree, out_degree, ops_series, g_names, c_names)
+            del_op, del_gain = self.best_del(group, comp_size, in_degree, out_degree, g_names)
             if add_gain >= del_gain and add_gain > 0:
                 # do add
                 ops_series.append(add_op)
-                curr_score = self.g_score(group, ops_series)  # change curr score
+                out_degree[g_names.index(add_op[1][0])] += 1
             elif del_gain > 0:
                 # do del
                 ops_series.append(del_op)
                 group.delete_edges([del_op[1]])  # group del edge
-                curr_score = self.g_score(group, ops_series)  # change curr score
-            self.budget -= 1
-            print("curr score: {}".format(curr_score))
-            if self.budget < 0 or (add_gain < 0 and del_gain < 0):
+            else:
                 break
-        print(ops_series)
-        print("run done")
+            curr_score = self.g_score(group, out_degree)  # change curr score
+            self.scores.append(curr_score)
+        return ops_series, curr_score
+
+
+profiler.register_phases(FlondaAlgo, {'g_score': 'evaluation', 'best_add': 'selection', 'best_del': 'selection'})
 
 
 if __name__ == '__main__':
     c = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
     g = graph_load.create_full_graph(5, 'g-')
     flonda_algo = FlondaAlgo(budget=10)
-    flonda_algo.run(g, c)
+    print(flonda_algo.run(g, c))
     print("ok")
@@ -1,168 +1,359 @@
+import os
 import time
 import random
 import numpy as np
 import igraph as ig
+import multiprocessing as mp
 import matplotlib.pyplot as plt
-from itertools import product
-from common import graph_cal, graph_load
-from common.my_func import is_no_dup_elems
-from common.constant import BASE_WEIGHT
+from common import graph_cal, graph_load, profiler
+from common.group_eval import GroupEvaluator
+from common.candidate_space import CandidateSpace
+from common.connectivity import ConnectivityOracle
+from common.hidden_score import HiddenScoreEvaluator
+from common.memo import LRUMemo
+
+
+DNA_DTYPE = np.int32  # a dna is a row of candidate ids
 
 
 class GeneticAlgo:
+    """ population as a matrix of candidate ids (pop size x dna size), ops only at run's return """
+
     def __init__(self, pop_size: int, sel_rate: float, crossover_rate: float, mutate_rate: float,
-                 iter_times: int):
+                 iter_times: int, cache_size: int = 1 << 20):
         self.pop_size = pop_size
         self.dna_size = None  # need to be determined by budget
         self.sel_rate = sel_rate
         self.crossover_rate = crossover_rate
         self.mutate_rate = mutate_rate
         self.iter_times = iter_times
+        self.space = None  # candidate ops of dna genes
+        self.evaluator = None  # incremental evaluator of group state
+        self.connected = {}  # {del genes: is group connected after them}
+        self.cache = LRUMemo(cache_size)  # fitness of canonical dna
 
-    def gen_origin_valid_pop(self, group: ig.Graph, comm_top_vertices: list):
-        origin_pop = []
-        ops = ['add', 'del']
-        del_choice = [(group.vs[e.source]['name'], group.vs[e.target]['name']) for e in group.es]  # only existing edges
-        add_choice = list(product(group.vs['name'], comm_top_vertices, repeat=1))  # [g_vs_name, c_vs_name]
-        for i in range(self.pop_size):
-            dna = []
-            for j in range(self.dna_size):
-                op = random.choice(ops)
-                edge = random.choice(del_choice) if op == 'del' else random.choice(add_choice)
-                dna.append((op, edge))
-            origin_pop.append(tuple(dna))  # list is not hashable
-        origin_pop = list(set(origin_pop))  # 去重
-        origin_valid_pop = self.eliminate_invalid_dna(origin_pop, group)
+    @staticmethod
+    def unique_dnas(population: np.ndarray) -> np.ndarray:
+        """ first dna of each canonical dna (genes are order-insensitive), in order """
+        if not len(population):
+            return population
+        _, first_idxs = np.unique(np.sort(population, axis=1), axis=0, return_index=True)
+        return population[np.sort(first_idxs)]
+
+    def gen_origin_valid_pop(self, oracle: ConnectivityOracle, space: CandidateSpace) -> np.ndarray:
+        origin_pop = self.unique_dnas(space.sample((self.pop_size, self.dna_size)).astype(DNA_DTYPE))  # 去重
+        origin_valid_pop = self.eliminate_invalid_dna(origin_pop, oracle)
         print("generate {}/{} origin valid population".format(len(origin_valid_pop), len(origin_pop)))
         return origin_valid_pop
 
-    @staticmethod
-    def eliminate_invalid_dna(population: list, group: ig.Graph):
+    def refill(self, population: np.ndarray, oracle: ConnectivityOracle, space: CandidateSpace, size: int,
+               max_rounds: int = 8) -> np.ndarray:
+        """ top population up to size with new random valid dnas, draws follow the valid rate seen so far """
+        valid_rate = 1 / 4
+        for _ in range(max_rounds):
+            need = size - len(population)
+            if need <= 0:
+                break
+            draws = space.sample((int(need / valid_rate) + 1, self.dna_size)).astype(DNA_DTYPE)
+            fresh = self.eliminate_invalid_dna(draws, oracle)
+            valid_rate = max(len(fresh) / len(draws), 1 / 64)
+            population = np.concatenate([population, fresh[:need]])
+        return population
+
+    def eliminate_invalid_dna(self, population: np.ndarray, oracle: ConnectivityOracle) -> np.ndarray:
+        space = self.space
         # invalid 1: no 'add' operation
-        first_valid_pop = []
-        for dna in population:
-            if 'add' in [_[0] for _ in dna]:
-                first_valid_pop.append(dna)
-        # invalid 2: duplicated add vertices in group or comm
-        second_valid_pop = []
-        for dna in first_valid_pop:
-            add_genes = [_[1] for _ in dna if _[0] == 'add']
-            add_group_vertices = [_[0] for _ in add_genes]
-            add_comm_vertices = [_[1] for _ in add_genes]
-            if is_no_dup_elems(add_group_vertices) and is_no_dup_elems(add_comm_vertices):
-                second_valid_pop.append(dna)
+        valid = space.is_add(population).any(axis=1)
+        # invalid 2: duplicated add vertices in group or comm (-1 for 'del' genes)
+        for add_v in (np.array(space.add_g_v), np.array(space.add_c_v)):
+            sorted_v = np.sort(add_v[population], axis=1)
+            valid &= ~((sorted_v[:, 1:] == sorted_v[:, :-1]) & (sorted_v[:, 1:] >= 0)).any(axis=1)
         # invalid 3: del or add the same edges 2 times or more
-        third_valid_pop = []
-        for dna in second_valid_pop:
-            if len(set([(gene[1][0], gene[1][1]) for gene in dna])) == len(dna):
-                third_valid_pop.append(dna)
-        # invalid 4: result in unconnected group
-        fourth_valid_pop = []
-        for dna in third_valid_pop:
-            group_copy = group.copy()
-            if_valid = True
-            for gene in dna:
-                if gene[0] == 'del':
-                    group_copy.delete_edges([gene[1]])
-                if not group_copy.is_connected():
-                    if_valid = False
-                    break
-            if if_valid:
-                fourth_valid_pop.append(dna)
-        return fourth_valid_pop
+        sorted_pop = np.sort(population, axis=1)
+        valid &= ~(sorted_pop[:, 1:] == sorted_pop[:, :-1]).any(axis=1)
+        # invalid 4: result in unconnected group, checked once for each set of del genes
+        # 'del' candidate ids are edge ids of edge_array(group), the same as the edge ids of oracle
+        del_genes = np.where(sorted_pop < space.num_del, sorted_pop, -1)
+        for idx in np.flatnonzero(valid):
+            del_key = tuple(del_genes[idx][del_genes[idx] >= 0].tolist())
+            if del_key not in self.connected:
+                self.connected[del_key] = oracle.is_connected_after(del_key)
+            valid[idx] = self.connected[del_key]
+        return population[valid]
 
     @staticmethod
     def fitness(dna: tuple, group: ig.Graph, comm: ig.Graph, conv_rate: float) -> float:
-        group_copy = group.copy()  # in case group is modified
-        del_genes = [_ for _ in dna if _[0] == 'del']
-        add_genes = [_ for _ in dna if _[0] == 'add']
-        # cal after ops
-        for gene in del_genes:
-            group_copy.delete_edges([gene[1]])
-        out_score = 0
-        for gene in add_genes:
-            g_v_name, c_v_name = gene[1]
-            out_attraction = 1 + BASE_WEIGHT * comm.degree(c_v_name)
-            in_attraction = graph_cal.cal_as_of_vertex(group_copy, g_v_name)
-            out_score += (out_attraction / in_attraction)
-        in_score = graph_cal.cal_safeness_of_graph(group_copy)
-        convenience = graph_cal.cal_convenience_of_graph(group_copy)
-        return out_score + in_score + conv_rate * convenience
-
-    def select(self, population: list, group: ig.Graph, comm: ig.Graph, conv_rate: float):
-        fitness_scores = [self.fitness(_, group, comm, conv_rate) for _ in population]
-        tot_score = sum(fitness_scores)
-        survive_probs = list(map(lambda x: x / tot_score, fitness_scores))
+        return GroupEvaluator.of_ops(group, comm, conv_rate, dna).score()
+
+    def fitness_batch(self, population: np.ndarray) -> np.ndarray:
+        """ fitness of a whole population, each distinct dna is evaluated once and memoized """
+        if not len(population):
+            return np.empty(0)
+        uniq, inverse = np.unique(np.sort(population, axis=1), axis=0, return_inverse=True)
+        self.cache.hits += len(population) - len(uniq)  # duplicated in this batch, evaluated once
+        uniq_scores = np.empty(len(uniq))
+        missing = []  # [(key, idx in uniq)]
+        for i, key in enumerate(map(tuple, uniq.tolist())):
+            score = self.cache.get(key)
+            if score is None:
+                missing.append((key, i))
+            else:
+                uniq_scores[i] = score
+        # dnas with similar del genes are evaluated one after another, so the evaluator moves less
+        for key, i in sorted(missing, key=lambda x: [_ for _ in x[0] if _ < self.space.num_del]):
+            self.evaluator.set_ops(self.space.to_ops(key))
+            uniq_scores[i] = self.evaluator.score()
+            self.cache.put(key, uniq_scores[i])
+        return uniq_scores[inverse.reshape(-1)]
+
+    def select(self, population: np.ndarray) -> np.ndarray:
+        fitness_scores = self.fitness_batch(population)
+        survive_probs = fitness_scores / fitness_scores.sum()
         # select in valid pop by prob
-        sel_dna_idxs = np.random.choice([i for i in range(len(population))],
-                                        size=int(len(population) * self.sel_rate), replace=True, p=survive_probs)
-        sel_pop = [population[_] for _ in sel_dna_idxs]
-        return sel_pop
-
-    def crossover(self, population: list):
-        children_pop = []
-        for dna in population:
-            if np.random.rand() < self.crossover_rate:
-                parent_dna_idx = random.choice([_ for _ in range(len(population))])
-                cross_points = np.random.randint(0, 2, size=self.dna_size).astype(np.bool)
-                child_dna = []
-                for i in range(self.dna_size):
-                    child_dna.append(population[parent_dna_idx][i] if cross_points[i] else dna[i])
-                children_pop.append(child_dna)
-        return children_pop
-
-    def mutate(self, population: list, group: ig.Graph, comm_top_vertices: list):
-        ops = ['add', 'del']
-        del_choice = [(group.vs[e.source]['name'], group.vs[e.target]['name']) for e in group.es]  # only existing edges
-        add_choice = list(product(group.vs['name'], comm_top_vertices, repeat=1))  # [g_vs_name, c_vs_name]
-        mutated_pop = []
-        for dna in population:
-            for i in range(self.dna_size):
-                if np.random.rand() < self.mutate_rate:
-                    op_name = random.choice(ops)
-                    op_edge = random.choice(del_choice) if op_name == 'del' else random.choice(add_choice)
-                    dna[i] = (op_name, op_edge)
-            mutated_pop.append(dna)
-        return mutated_pop
-
-    def evolution(self, population: list, group: ig.Graph, comm: ig.Graph, conv_rate: float, comm_top_vertices: list):
-        sel_pop = self.select(population, group, comm, conv_rate)
+        sel_dna_idxs = np.random.choice(len(population), size=int(len(population) * self.sel_rate),
+                                        replace=True, p=survive_probs)
+        return population[sel_dna_idxs]
+
+    def crossover(self, population: np.ndarray) -> np.ndarray:
+        """ uniform crossover of each dna picked by crossover rate with a random mate, children are new rows """
+        dnas = population[np.random.rand(len(population)) < self.crossover_rate]
+        mates = population[np.random.randint(0, len(population), size=len(dnas))]
+        cross_points = np.random.randint(0, 2, size=dnas.shape).astype(bool)
+        return np.where(cross_points, mates, dnas)
+
+    def mutate(self, population: np.ndarray, space: CandidateSpace) -> np.ndarray:
+        mutate_points = np.random.rand(*population.shape) < self.mutate_rate
+        if mutate_points.any():
+            population[mutate_points] = space.sample(int(mutate_points.sum()))
+        return population
+
+    def evolution(self, population: np.ndarray, oracle: ConnectivityOracle, space: CandidateSpace) -> np.ndarray:
+        sel_pop = self.select(population)
         cross_pop = self.crossover(sel_pop)
-        mutated_pop = self.mutate(cross_pop, group, comm_top_vertices)
-        evolution_valid_pop = self.eliminate_invalid_dna(mutated_pop, group)
+        mutated_pop = self.mutate(cross_pop, space)
+        evolution_valid_pop = self.eliminate_invalid_dna(mutated_pop, oracle)
         return evolution_valid_pop
 
-    def run(self, group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float):
+    def setup(self, group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float) -> (
+            ConnectivityOracle, CandidateSpace):
         max_budget = group.vcount() + (group.ecount() - (group.vcount() - 1))  # max budget
         if budget > max_budget:
             budget = max_budget
         self.dna_size = budget
-        comm_top_vertices = [_[0] for _ in sorted([(_['name'], comm.degree(_)) for _ in comm.vs],
-                                                  key=lambda x: x[1], reverse=True)[:budget]]
-        pop = self.gen_origin_valid_pop(group, comm_top_vertices)
-        scores = [self.fitness(_, group, comm, conv_rate) for _ in pop]
-        best_idx = scores.index(max(scores))
+        self.space = CandidateSpace(group, comm, budget)
+        self.evaluator = GroupEvaluator(group, comm, conv_rate)
+        self.cache = LRUMemo(self.cache.max_size)
+        self.connected = {}
+        return ConnectivityOracle(group), self.space
+
+    def run(self, group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float, plot_hidden: bool = False):
+        """ best ops and score, plot_hidden scatters each generation's best score against its hidden score """
+        oracle, space = self.setup(group, comm, budget, conv_rate)
+        pop = self.gen_origin_valid_pop(oracle, space)
+        scores = self.fitness_batch(pop)
+        best_idx = int(np.argmax(scores))
         # print("origin: best ops: {}, best score: {}".format(pop[best_idx], scores[best_idx]))
         avg_scores = []
         best_each_gen = [(pop[best_idx], scores[best_idx])]
         for i in range(self.iter_times):
-            pop = self.evolution(pop, group, comm, conv_rate, comm_top_vertices)
+            pop = self.evolution(pop, oracle, space)
             if len(pop) < 2:
                 break
-            scores = [self.fitness(_, group, comm, conv_rate) for _ in pop]
-            best_idx = scores.index(max(scores))
+            scores = self.fitness_batch(pop)
+            best_idx = int(np.argmax(scores))
             best_each_gen.append((pop[best_idx], scores[best_idx]))
             # print("iter {}: best ops: {}, best score: {}".format(i + 1, pop[best_idx], scores[best_idx]))
-            avg_scores.append(sum([self.fitness(_, group, comm, conv_rate) for _ in pop]) / len(pop))
+            avg_scores.append(scores.mean())
+        print("fitness cache: {}".format(self.cache.report()))
         # print("each iter avg score: {}".format(avg_scores))
+        best_each_gen = [(space.to_ops(dna), score) for dna, score in best_each_gen]
         # for _ in best_each_gen: print(_)
-        hidden_scores = [graph_cal.cal_hidden_score(group.copy(), comm.copy(), _[0])[1] for _ in best_each_gen]
-        our_scores = [_[1] for _ in best_each_gen]
-        # plt.scatter(our_scores, hidden_scores)
-        # plt.show()
+        if plot_hidden:
+            hidden_results = HiddenScoreEvaluator(group, comm).batch_score([_[0] for _ in best_each_gen])
+            plt.scatter([_[1] for _ in best_each_gen], [_.hidden_score for _ in hidden_results])
+            plt.show()
         return max(best_each_gen, key=lambda x: x[1])
 
 
+profiler.register_phases(GeneticAlgo, {'gen_origin_valid_pop': 'init', 'mutate': 'disturbance',
+                                       'fitness_batch': 'evaluation', 'select': 'selection', 'crossover': 'crossover',
+                                       'eliminate_invalid_dna': 'validation'})
+
+# sources of the migrants of island i among n islands: (i, n, rng) -> [island]
+MIGRATION_TOPOLOGIES = {
+    'ring': lambda i, n, rng: [(i - 1) % n] if n > 1 else [],
+    'full': lambda i, n, rng: [_ for _ in range(n) if _ != i],
+    'random': lambda i, n, rng: [int((i + rng.integers(1, n)) % n)] if n > 1 else [],
+}
+
+
+class Island:
+    """ a sub-population evolved by its own GeneticAlgo, with its own random states
+
+    a ga population shrinks by selection and crossover and dies out in a few generations, so an island is refilled
+    with random valid dnas to the size of its origin valid population after every generation.
+    random states are swapped in around each epoch, so results do not depend on how islands share processes.
+    """
+
+    def __init__(self, group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float, ga_args: dict, seed: int):
+        random.seed(seed)
+        np.random.seed(seed)
+        self.ga = GeneticAlgo(**ga_args)
+        self.oracle, self.space = self.ga.setup(group, comm, budget, conv_rate)
+        self.pop = self.ga.gen_origin_valid_pop(self.oracle, self.space)
+        self.size = len(self.pop)  # target size of the island
+        self.best = (None, -np.inf)
+        self.update_best(self.pop)
+        self.random_states = (random.getstate(), np.random.get_state())
+
+    def update_best(self, pop: np.ndarray) -> np.ndarray:
+        scores = self.ga.fitness_batch(pop)
+        if len(pop) and scores.max() > self.best[1]:
+            best_idx = int(np.argmax(scores))
+            self.best = (self.space.to_ops(pop[best_idx]), scores[best_idx])
+        return scores
+
+    def immigrate(self, migrants: list) -> int:
+        """ migrants new to the island replace its worst dnas, return the num of migrants taken in
+
+        islands of a run share the same candidate space, so dnas keep their meaning across islands.
+        """
+        if not len(migrants):
+            return 0
+        known = set(map(tuple, np.sort(self.pop, axis=1).tolist()))
+        incoming = self.ga.unique_dnas(np.concatenate(migrants))
+        new = incoming[np.array([tuple(_) not in known for _ in np.sort(incoming, axis=1).tolist()], dtype=bool)]
+        if len(new):
+            scores = self.ga.fitness_batch(self.pop)
+            keep = np.argsort(-scores, kind='stable')[:max(min(len(self.pop), self.size - len(new)), 0)]
+            self.pop = np.concatenate([self.pop[np.sort(keep)], new])
+            self.update_best(new)
+        return len(new)
+
+    def evolve(self, migrants: list, generations: int, num_migrants: int) -> dict:
+        """ take migrants (dna matrices) in, evolve some generations, return the best so far and the top dnas """
+        random.setstate(self.random_states[0])
+        np.random.set_state(self.random_states[1])
+        migrated = self.immigrate(migrants)
+        for _ in range(generations):
+            if len(self.pop) < 2:
+                break
+            self.pop = self.ga.refill(self.ga.evolution(self.pop, self.oracle, self.space), self.oracle, self.space,
+                                      self.size)
+            self.update_best(self.pop)
+        scores = self.ga.fitness_batch(self.pop)  # cached
+        top = self.ga.unique_dnas(self.pop[np.argsort(-scores, kind='stable')])[:num_migrants]
+        self.random_states = (random.getstate(), np.random.get_state())
+        return {'best': self.best, 'top': top, 'size': len(self.pop), 'migrated': migrated}
+
+
+def island_worker(conn, group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float, ga_args: dict,
+                  seeds: dict):
+    """ evolve the islands {island: seed} of a process, one epoch per message (generations, {island: migrants}) """
+    islands = {i: Island(group, comm, budget, conv_rate, ga_args, seed) for i, seed in seeds.items()}
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:  # run terminated
+            break
+        if msg is None:
+            break
+        generations, num_migrants, migrants = msg
+        conn.send({i: islands[i].evolve(migrants[i], generations, num_migrants) for i in migrants})
+    conn.close()
+
+
+class IslandGeneticAlgo:
+    """ genetic algo as islands of sub-populations evolving in parallel processes
+
+    every migration_interval generations, each island sends its top num_migrants dnas to the islands that take
+    them by topology, where the new ones replace the worst dnas. islands are refilled after every generation, so
+    they live through the run. the run stops after iter_times generations, once every island dies out (no valid
+    dna can be drawn), or once the best score of all islands is not improved for patience epochs.
+    """
+
+    def __init__(self, pop_size: int, sel_rate: float, crossover_rate: float, mutate_rate: float, iter_times: int,
+                 islands: int = 4, migration_interval: int = 10, num_migrants: int = 10, topology: str = 'ring',
+                 patience: int = None, processes: int = None, seed: int = None):
+        assert topology in MIGRATION_TOPOLOGIES, "unknown topology: {}".format(topology)
+        self.ga_args = dict(pop_size=max(pop_size // islands, 2), sel_rate=sel_rate, crossover_rate=crossover_rate,
+                            mutate_rate=mutate_rate, iter_times=iter_times)
+        self.iter_times = iter_times
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.topology = topology
+        self.patience = patience
+        self.processes = processes if processes else min(islands, os.cpu_count())
+        self.seed = seed
+        self.epochs = 0
+        self.num_migrated = 0  # migrants taken in by islands
+
+    def migrate(self, results: dict, rng: np.random.Generator) -> dict:
+        """ {island: [top dnas of its sources]} of the next epoch """
+        sources = MIGRATION_TOPOLOGIES[self.topology]
+        return {i: [results[j]['top'] for j in sources(i, self.islands, rng)] for i in results}
+
+    def epochs_of(self, evolve_epoch) -> (tuple, float):
+        """ run epochs with evolve_epoch(generations, migrants) -> {island: result}, return the best (dna, score) """
+        rng = np.random.default_rng(self.seed)
+        migrants, best, stale, generations = {i: [] for i in range(self.islands)}, (None, -np.inf), 0, 0
+        self.epochs, self.num_migrated = 0, 0
+        while generations < self.iter_times:
+            step = min(self.migration_interval, self.iter_times - generations)
+            results = evolve_epoch(step, migrants)
+            generations += step
+            self.epochs += 1
+            self.num_migrated += sum([_['migrated'] for _ in results.values()])
+            epoch_best = max([_['best'] for _ in results.values()], key=lambda x: x[1])
+            if epoch_best[1] > best[1]:
+                best, stale = epoch_best, 0
+            else:
+                stale += 1
+            if all(_['size'] < 2 for _ in results.values()) or (self.patience and stale >= self.patience):
+                break
+            migrants = self.migrate(results, rng)
+        print("{} islands, {} epochs, {} migrants taken, best score: {}".format(self.islands, self.epochs,
+                                                                            self.num_migrated, best[1]))
+        return best
+
+    def run(self, group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float) -> (tuple, float):
+        seeds = np.random.SeedSequence(self.seed).generate_state(self.islands).tolist()
+        if self.processes == 1:
+            islands = {i: Island(group, comm, budget, conv_rate, self.ga_args, seed) for i, seed in enumerate(seeds)}
+            return self.epochs_of(lambda step, migrants: {
+                i: islands[i].evolve(migrants[i], step, self.num_migrants) for i in migrants})
+        parts = np.array_split(np.arange(self.islands), self.processes)
+        workers = []  # [(process, conn, islands of process)]
+        for part in parts:
+            conn, child_conn = mp.Pipe()
+            process = mp.Process(target=island_worker, args=(child_conn, group, comm, budget, conv_rate,
+                                                             self.ga_args, {int(i): seeds[i] for i in part}))
+            process.start()
+            child_conn.close()
+            workers.append((process, conn, part.tolist()))
+
+        def evolve_epoch(step: int, migrants: dict) -> dict:
+            for _, conn, part in workers:
+                conn.send((step, self.num_migrants, {i: migrants[i] for i in part}))
+            results = {}
+            for _, conn, _ in workers:
+                results.update(conn.recv())
+            return results
+
+        try:
+            return self.epochs_of(evolve_epoch)
+        finally:
+            for process, conn, _ in workers:
+                if process.is_alive():
+                    conn.send(None)
+                conn.close()
+                process.join()
+
+
+profiler.register_phases(IslandGeneticAlgo, {'migrate': 'selection'})
+
+
 if __name__ == '__main__':
     c = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
     g = graph_load.create_full_graph(5, 'g-')
@@ -173,4 +364,10 @@ if __name__ == '__main__':
     end_time = time.time()
     print("#hidden: {}, {} #time: {}s".format(*graph_cal.cal_hidden_score(
         g.copy(), c.copy(), best[0]), end_time - start_time))
+    start_time = time.time()
+    island_algo = IslandGeneticAlgo(pop_size=20000, sel_rate=0.9, crossover_rate=0.8, mutate_rate=0.01,
+                                    iter_times=100, islands=4, seed=0)
+    best = island_algo.run(g.copy(), c.copy(), budget=6, conv_rate=0)
+    print("#hidden: {}, {} #time: {}s".format(*graph_cal.cal_hidden_score(
+        g.copy(), c.copy(), best[0]), time.time() - start_time))
     print("ok")
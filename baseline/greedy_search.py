@@ -1,6 +1,11 @@
+import heapq
+import numpy as np
 import igraph as ig
-from common import graph_cal, graph_load
-from common.constant import INF_BUDGET, BASE_WEIGHT
+from common import graph_cal, graph_load, profiler
+from common.comm_index import CommunityIndex
+from common.group_eval import GroupEvaluator
+from common.connectivity import ConnectivityOracle
+from common.constant import INF_BUDGET
 
 
 def sub_modular(score: list) -> bool:
@@ -9,70 +14,118 @@ def sub_modular(score: list) -> bool:
 
 
 class GreedySearch:
-    def __init__(self, budget: int, conv_rate: float):
+    """ greedy search on ops, lazy=True keeps a priority queue of deletion gains (CELF)
+
+    lazy mode is a heuristic: it treats gains evaluated at earlier steps as upper bounds of current gains and only
+    re-evaluates the top of the queue. the objective is not submodular in general, so a stale bound below the
+    current gain of its edge goes unnoticed, and lazy mode may pick other ops than the full scan. once a
+    re-evaluated top gain is found above its bound, every later step is a full scan. experiments use the full scan.
+    """
+
+    def __init__(self, budget: int, conv_rate: float, lazy: bool = False):
         self.budget = budget
         self.conv_rate = conv_rate
+        self.lazy = lazy
         self.vs_name_of_out_es = []  # [(c_v_name, g_v_name)]
         self.ops = []  # [(op_name, (c_v_name/g_v_name, g_v_name))]
         self.score = []
+        self.evaluator = None  # incremental evaluator of group state
+        self.oracle = None  # connectivity oracle of origin group (same edge ids as evaluator)
+        self.del_names = []  # [(g_v_name, g_v_name)] of each edge id
+        self.c_index = None  # degree index of community
+        self.gain_heap = None  # [(-gain bound, edge id, step of evaluation)]
+        self.num_steps = 0
+        self.num_evals = 0  # deletion gains evaluated
+        self.num_full_scans = 0
+        self.fallback_step = None  # step where a gain was found above its bound
 
-    def cal_score(self, comm: ig.Graph, group: ig.Graph) -> float:
-        out_safe = 0
-        for i in range(len(self.vs_name_of_out_es)):
-            c_v_name, g_v_name = self.vs_name_of_out_es[i]
-            out_attraction = 1 + BASE_WEIGHT * comm.degree(c_v_name)
-            in_attraction = graph_cal.cal_as_of_vertex(group, g_v_name)
-            out_safe += (out_attraction / in_attraction - 1)
-        in_safe = graph_cal.cal_safeness_of_graph(group)
-        score = out_safe + in_safe + self.conv_rate * graph_cal.cal_convenience_of_graph(group)
-        return score
+    def eval_score(self) -> float:
+        """ score of current state, an add op counts its out attraction ratio minus 1 """
+        return self.evaluator.score() - len(self.vs_name_of_out_es)
 
     def first_add_out_edge(self, comm: ig.Graph, group: ig.Graph):
-        new_comm = graph_load.union_two_graphs(comm, group)  # init new community
-        c_degree = {_['name']: comm.degree(_) for _ in comm.vs}
-        c_v_with_max_degree = max(c_degree, key=c_degree.get)  # find the vertex of max degree in community
+        new_comm = graph_load.cached_union_two_graphs(comm, group)  # init new community
+        c_v_with_max_degree = self.c_index.top_names(1)[0]  # find the vertex of max degree in community
         # greedy strategy: choose the vertex with max degree as the vertex with highest attract score
-        g_attract_score = {_['name']: graph_cal.cal_as_of_vertex(group, _['name']) for _ in group.vs}
+        g_attract_score = dict(zip(group.vs['name'], self.evaluator.attraction))
         g_v_with_min_attract_score = min(g_attract_score, key=g_attract_score.get)
         new_comm.add_edge(c_v_with_max_degree, g_v_with_min_attract_score)  # add an out edge
         self.ops.append(('add', (c_v_with_max_degree, g_v_with_min_attract_score)))  # update op
         self.vs_name_of_out_es.append((c_v_with_max_degree, g_v_with_min_attract_score))
-        self.score.append(self.cal_score(comm, group))
+        self.evaluator.apply(('add', (g_v_with_min_attract_score, c_v_with_max_degree)))
+        self.evaluator.commit()
+        self.score.append(self.eval_score())
         return new_comm
 
+    def del_gain(self, eid: int, pre_score: float):
+        """ score gain of deleting edge eid (state is unchanged), None if group is disconnected """
+        if not self.oracle.is_connected_after(self.evaluator.del_eids + [eid]):
+            return None
+        self.num_evals += 1
+        checkpoint = self.evaluator.checkpoint()
+        self.evaluator.apply(('del', self.del_names[eid]))  # not execute op here
+        gain = self.eval_score() - pre_score
+        self.evaluator.rollback(checkpoint)
+        return gain
+
+    def full_scan_del(self, pre_score: float) -> (tuple, float):
+        """ evaluate deleting each inside edge, return the best (op, gain) with positive gain """
+        self.num_full_scans += 1
+        delete_inside_edge = {}
+        for eid in np.flatnonzero(self.evaluator.alive).tolist():
+            gain = self.del_gain(eid, pre_score)
+            if gain is not None:
+                delete_inside_edge[eid] = gain
+        self.gain_heap = [(-gain, eid, self.num_steps) for eid, gain in delete_inside_edge.items()]
+        heapq.heapify(self.gain_heap)
+        delete_inside_edge = {eid: gain for eid, gain in delete_inside_edge.items() if gain > 0}
+        if len(delete_inside_edge):
+            del_eid = max(delete_inside_edge, key=delete_inside_edge.get)
+            return self.del_names[del_eid], delete_inside_edge[del_eid]
+        return None, None
+
+    def lazy_del(self, pre_score: float) -> (tuple, float):
+        """ re-evaluate the top of the gain queue until a gain of this step is on top """
+        if self.gain_heap is None:
+            return self.full_scan_del(pre_score)
+        while len(self.gain_heap):
+            neg_bound, eid, step = self.gain_heap[0]
+            if step == self.num_steps:
+                break
+            gain = self.del_gain(eid, pre_score) if self.evaluator.alive[eid] else None
+            if gain is None:  # deleted, or disconnects group from now on
+                heapq.heappop(self.gain_heap)
+            elif gain > -neg_bound + 1e-12:
+                self.fallback_step = self.num_steps  # gains are not diminishing on this group
+                return self.full_scan_del(pre_score)
+            else:
+                heapq.heapreplace(self.gain_heap, (-gain, eid, self.num_steps))
+        if len(self.gain_heap) and self.gain_heap[0][0] < 0:
+            return self.del_names[self.gain_heap[0][1]], -self.gain_heap[0][0]
+        return None, None
+
     def select_op(self, comm: ig.Graph, group: ig.Graph):
         """ select operation: 1. delete inside edge; 2. add outside edge """
-        pre_score = self.cal_score(comm, group)
+        pre_score = self.eval_score()
+        self.num_steps += 1
         # 1. delete inside edges
-        delete_inside_edge = {}
-        for e in group.es:
-            v1, v2 = group.vs[e.source]['name'], group.vs[e.target]['name']
-            group.delete_edges([(v1, v2)])
-            if group.is_connected():
-                score_after_del = self.cal_score(comm, group)
-                if score_after_del > pre_score:
-                    delete_inside_edge[(v1, v2)] = score_after_del - pre_score
-            group.add_edge(v1, v2)  # add edge back (not execute op here)
-        if len(delete_inside_edge):
-            del_op = max(delete_inside_edge, key=delete_inside_edge.get)
-            del_op_gain = delete_inside_edge[del_op]
+        if self.lazy and self.fallback_step is None:
+            del_op, del_op_gain = self.lazy_del(pre_score)
         else:
-            del_op, del_op_gain = None, None
+            del_op, del_op_gain = self.full_scan_del(pre_score)
         # 2. add outside edges: link C(max degree) and G(min attract score)
-        c_degree = {_['name']: comm.degree(_) for _ in comm.vs
-                    if _['name'] not in [_[0] for _ in self.vs_name_of_out_es]}
-        g_attract_score = {_['name']: graph_cal.cal_as_of_vertex(group, _['name']) for _ in group.vs
-                           if _['name'] not in [_[1] for _ in self.vs_name_of_out_es]}
+        used_c_vs, used_g_vs = {_[0] for _ in self.vs_name_of_out_es}, {_[1] for _ in self.vs_name_of_out_es}
+        # used vertices are the top ones, so the first unused is among the top len(used) + 1
+        add_c_v = next((_ for _ in self.c_index.top_names(len(used_c_vs) + 1) if _ not in used_c_vs), None)
+        g_attract_score = {v_name: self.evaluator.attraction[i] for v_name, i in self.evaluator.v_idx.items()
+                           if v_name not in used_g_vs}
         add_op, add_op_gain = None, None
-        if len(g_attract_score) and len(c_degree):
+        if len(g_attract_score) and add_c_v is not None:
             # (c_vertex, g_vertex)
-            add_c_v = max(c_degree, key=c_degree.get)
             add_g_v = min(g_attract_score, key=g_attract_score.get)
-            self.vs_name_of_out_es.append((add_c_v, add_g_v))
-            score_after_add = self.cal_score(comm, group)
-            self.vs_name_of_out_es.pop()  # del edge back
+            score_after_add = pre_score + self.evaluator.delta(('add', (add_g_v, add_c_v))) - 1
             if score_after_add >= pre_score:
-                add_op = (max(c_degree, key=c_degree.get), min(g_attract_score, key=g_attract_score.get))
+                add_op = (add_c_v, add_g_v)
                 add_op_gain = score_after_add - pre_score
         # 3. select operation
         if (del_op and (not add_op) and del_op_gain > 0) or (
@@ -90,20 +143,29 @@ class GreedySearch:
         if_continue = True
         if op_name == 'del':
             self.ops.append(('del', op_vs))  # update op
+            self.evaluator.apply(('del', op_vs))
             group.delete_edges([op_vs])
+            graph_load.touch(group)  # values memoized on group are rebuilt
             new_community.delete_edges([op_vs])
         elif op_name == 'add':  # (c_v_name, g_v_name)
             self.ops.append(('add', op_vs))  # update op
             self.vs_name_of_out_es.append(op_vs)
+            self.evaluator.apply(('add', op_vs[::-1]))
+            self.gain_heap = None  # out attraction of a new out edge raises the gains of deletions
             new_community.add_edge(*op_vs)
         else:
             if_continue = False
+        self.evaluator.commit()
         return if_continue, group, new_community
 
     def run(self, comm: ig.Graph, group: ig.Graph):
         max_budget = group.vcount() + (group.ecount() - (group.vcount() - 1))  # max budget
         if self.budget > max_budget:
             self.budget = max_budget
+        self.evaluator = GroupEvaluator(group, comm, self.conv_rate)
+        self.oracle = ConnectivityOracle(group)
+        self.del_names = [(group.vs[u]['name'], group.vs[v]['name']) for u, v in self.evaluator.edges.tolist()]
+        self.c_index = CommunityIndex.of(comm)
         new_comm = self.first_add_out_edge(comm, group)
         while True:
             # print("op {}: {}, {} -> score: {}".format(len(self.ops), *self.ops[-1], self.score[-1]))
@@ -111,7 +173,7 @@ class GreedySearch:
                 break
             op_name, op_vs = self.select_op(comm, group)
             if_continue, group, new_comm = self.execute_op(group, new_comm, op_name, op_vs)
-            self.score.append(self.cal_score(comm, group))
+            self.score.append(self.eval_score())
             if not if_continue:
                 break
         # ig.plot(new_comm, "../data/result/new_community_final.pdf")  # save plot.pdf
@@ -120,6 +182,16 @@ class GreedySearch:
         # print("hiding done with {} ops".format(len(self.ops)))
         return self.ops
 
+    def report(self) -> dict:
+        """ search cost and diminishing returns of the last run """
+        return {'lazy': self.lazy, 'steps': self.num_steps, 'gain_evals': self.num_evals,
+                'full_scans': self.num_full_scans, 'fallback_step': self.fallback_step,
+                'sub_modular': sub_modular(self.score)}
+
+
+profiler.register_phases(GreedySearch, {'first_add_out_edge': 'init', 'del_gain': 'evaluation',
+                                        'select_op': 'selection', 'execute_op': 'disturbance'})
+
 
 if __name__ == '__main__':
     greedy_search = GreedySearch(INF_BUDGET, 0)  # instant
@@ -130,4 +202,5 @@ if __name__ == '__main__':
     ops = greedy_search.run(c.copy(), g.copy())  # hiding
     disperse, hidden_score = graph_cal.cal_hidden_score(c, g, ops)  # metrics
     print("group in cluster({}): {}".format(hidden_score, disperse))
+    print(greedy_search.report())
     print("ok")
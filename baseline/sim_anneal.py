@@ -1,24 +1,51 @@
 import math
 import time
-import random
 import numpy as np
 import igraph as ig
-from itertools import product
+from collections import deque
 from scipy.special import comb
-from common import graph_cal, graph_load
-from common.constant import BASE_WEIGHT
+from common import graph_cal, graph_load, profiler
+from common.group_eval import GroupEvaluator
+from common.candidate_space import CandidateSpace
+from common.connectivity import ConnectivityOracle
+from common.memo import LRUMemo
+
+MAX_TABU_TRIES = 100  # proposals rejected as tabu before the tabu list is ignored for a move
 
 
 class SimulatedAnnealing:
-    def __init__(self, budget: int, conv_rate: float):
+    """ time_limit (seconds) or max_steps turns on the anytime mode: the temperature falls geometrically with the
+    spent fraction of the limit, the best ops seen are returned, and the run stops early after patience
+    moves without a new best. max_steps and patience count judged moves, memoized or not.
+    the default schedule keeps the original behaviour and returns the ops of the last state, not the best seen.
+
+    energies of visited states are memoized by their sorted candidate ids (inf for invalid states), so revisited
+    states are neither re-evaluated nor re-validated. tabu_size > 0 keeps the states the chain just left out of
+    its proposals.
+    """
+
+    def __init__(self, budget: int, conv_rate: float, time_limit: float = None, max_steps: int = None,
+                 patience: int = None, memo_size: int = 1 << 16, tabu_size: int = 0):
         self.budget = budget
         self.conv_rate = conv_rate
+        self.time_limit = time_limit
+        self.max_steps = max_steps
+        self.patience = patience
+        self.memo = LRUMemo(memo_size)  # {state key: energy}
+        self.tabu = deque(maxlen=tabu_size)  # keys of the states left last
+        self.num_evals = 0
+        self.num_steps = 0  # moves judged
+        self.num_evals_saved = 0  # memo hits that were rejected, so the evaluator never moved
+        self.num_valid_saved = 0  # validity checks answered by the memo
+        self.num_tabu = 0  # proposals rejected as tabu
+        self.elapsed = 0
+        self.stop_reason = None
+        self.best_score = None
 
     @staticmethod
-    def is_valid_ops(ops: list, group: ig.Graph):
+    def is_valid_ops(ops: list, oracle: ConnectivityOracle):
         ops_edges = [_[1] for _ in ops]
         add_ops = [_[1] for _ in ops if _[0] == 'add']
-        del_ops = [_[1] for _ in ops if _[0] == 'del']
         # invalid 1: no 'add' ops
         if not len(add_ops):
             return False
@@ -30,27 +57,10 @@ class SimulatedAnnealing:
         if len(set(ops_edges)) != len(ops_edges):
             return False
         # invalid 4: unconnected
-        group_copy = group.copy()  # in case group is modified
-        for del_op in del_ops:
-            group_copy.delete_edges([del_op])
-        return True if group_copy.is_connected() else False
+        return oracle.is_connected_after_ops(ops)
 
     def obj_fun(self, ops: list, group: ig.Graph, comm: ig.Graph) -> float:
-        group_copy = group.copy()  # in case group is modified
-        del_ops = [_[1] for _ in ops if _[0] == 'del']
-        add_ops = [_[1] for _ in ops if _[0] == 'add']
-        # cal after ops
-        for del_op in del_ops:
-            group_copy.delete_edges([del_op])
-        out_score = 0
-        for add_op in add_ops:
-            g_v_name, c_v_name = add_op
-            in_attraction = graph_cal.cal_as_of_vertex(group_copy, g_v_name)
-            out_attraction = 1 + BASE_WEIGHT * comm.degree(c_v_name)
-            out_score += (out_attraction / in_attraction)
-        in_score = graph_cal.cal_safeness_of_graph(group_copy)
-        convenience = graph_cal.cal_convenience_of_graph(group_copy)
-        return -(out_score + in_score + self.conv_rate * convenience)  # min
+        return -GroupEvaluator.of_ops(group, comm, self.conv_rate, ops).score()  # min
 
     @staticmethod
     def judge(deltaE, T) -> bool:
@@ -60,42 +70,128 @@ class SimulatedAnnealing:
             prob = math.exp(-deltaE / T)
             return True if prob > np.random.rand() else False
 
-    def disturbance(self, ops: list, group: ig.Graph, comm_top_vertices: list):
-        op_choice = ['add', 'del']
-        del_choice = [(group.vs[e.source]['name'], group.vs[e.target]['name']) for e in group.es]  # only existing edges
-        add_choice = list(product(group.vs['name'], comm_top_vertices, repeat=1))  # [g_vs_name, c_vs_name]
+    @staticmethod
+    def state_key(cids: list) -> tuple:
+        return tuple(sorted(cids))
+
+    def is_valid_state(self, key: tuple, ops: list, oracle: ConnectivityOracle) -> bool:
+        energy = self.memo.peek(key)
+        if energy is not None:
+            self.num_valid_saved += 1
+            return energy != math.inf
+        if self.is_valid_ops(ops, oracle):
+            return True
+        self.memo.put(key, math.inf)
+        return False
+
+    def disturbance(self, ops: list, oracle: ConnectivityOracle, space: CandidateSpace):
+        ops = list(ops)  # keep current ops unchanged in case the move is rejected
+        cids = [space.cid(_) for _ in ops]
         # mutate
-        mutated_op_idx = random.choice([_ for _ in range(len(ops))])
+        mutated_op_idx = np.random.randint(len(ops))
+        other_cids = cids[:mutated_op_idx] + cids[mutated_op_idx + 1:]
+        tabu_tries = 0
         while True:
-            mutated_name = random.choice(op_choice)
-            mutated_edge = random.choice(del_choice) if mutated_name == 'del' else random.choice(add_choice)
-            ops[mutated_op_idx] = (mutated_name, mutated_edge)
-            if self.is_valid_ops(ops, group):
+            cid = space.sample_allowed(other_cids)
+            ops[mutated_op_idx] = space.op(cid)
+            key = self.state_key(other_cids + [cid])
+            if key in self.tabu and tabu_tries < MAX_TABU_TRIES:
+                self.num_tabu += 1
+                tabu_tries += 1
+                continue
+            if self.is_valid_state(key, ops, oracle):
                 break
         return ops
 
-    def gen_valid_ops(self, group: ig.Graph, comm_top_vertices: list):
-        op_choice = ['add', 'del']
-        del_choice = [(group.vs[e.source]['name'], group.vs[e.target]['name']) for e in group.es]  # only existing edges
-        add_choice = list(product(group.vs['name'], comm_top_vertices, repeat=1))  # [g_vs_name, c_vs_name]
+    def anneal_step(self, curr_ops: list, curr_energy: float, tmp: float, evaluator: GroupEvaluator,
+                    oracle: ConnectivityOracle, space: CandidateSpace) -> (list, float, float):
+        """ propose a move and judge it, return (ops, energy, delta energy) of the state after the step """
+        self.num_steps += 1
+        next_ops = self.disturbance(curr_ops, oracle, space)
+        next_key = self.state_key([space.cid(_) for _ in next_ops])
+        next_energy = self.memo.get(next_key)
+        moved = next_energy is None
+        if moved:
+            next_energy = self.evaluate(curr_ops, next_ops, evaluator)
+            self.memo.put(next_key, next_energy)
+        delta_energy = next_energy - curr_energy
+        if self.judge(delta_energy, tmp):  # accept
+            if not moved:
+                self.move(curr_ops, next_ops, evaluator)
+            evaluator.commit()
+            self.tabu.append(self.state_key([space.cid(_) for _ in curr_ops]))
+            return next_ops, next_energy, delta_energy
+        if moved:
+            evaluator.rollback()
+        else:
+            self.num_evals_saved += 1  # an accepted memo hit still moves the evaluator, as much work as a scoring
+        return curr_ops, curr_energy, delta_energy
+
+    def evaluate(self, curr_ops: list, next_ops: list, evaluator: GroupEvaluator) -> float:
+        """ move evaluator from curr ops to next ops, return the energy of next ops """
+        self.move(curr_ops, next_ops, evaluator)
+        self.num_evals += 1
+        return -evaluator.score()
+
+    @staticmethod
+    def move(curr_ops: list, next_ops: list, evaluator: GroupEvaluator):
+        for curr_op, next_op in zip(curr_ops, next_ops):  # only the mutated op is re-evaluated
+            if curr_op != next_op:
+                evaluator.remove(curr_op)
+                evaluator.apply(next_op)
+
+    def gen_valid_ops(self, oracle: ConnectivityOracle, space: CandidateSpace):
         while True:
-            ops = []
-            for i in range(self.budget):
-                op_name = random.choice(op_choice)
-                op_edge = random.choice(del_choice) if op_name == 'del' else random.choice(add_choice)
-                ops.append((op_name, op_edge))
-            if self.is_valid_ops(ops, group):
+            ops = list(space.to_ops(space.sample(self.budget)))
+            if self.is_valid_ops(ops, oracle):
                 break
         return ops
 
+    def progress(self, start_time: float) -> float:
+        """ spent fraction of the anytime limits """
+        self.elapsed = time.perf_counter() - start_time
+        spent = [self.elapsed / self.time_limit if self.time_limit else 0,
+                 self.num_steps / self.max_steps if self.max_steps else 0]
+        return max(spent)
+
+    def anytime_run(self, ops: list, evaluator: GroupEvaluator, oracle: ConnectivityOracle, space: CandidateSpace,
+                    start_time: float):
+        """ anneal from ops until a limit is spent or patience runs out, return the best ops seen """
+        tmp_max, tmp_min = 1e5, 1e-2
+        curr_ops, curr_energy = ops, -evaluator.score()
+        best_ops, best_energy, best_step = curr_ops, curr_energy, 0
+        self.stop_reason = 'limit'
+        while True:
+            progress = self.progress(start_time)
+            if progress >= 1:
+                break
+            if self.patience is not None and self.num_steps - best_step >= self.patience:
+                self.stop_reason = 'stagnation'
+                break
+            tmp = tmp_max * (tmp_min / tmp_max) ** progress
+            curr_ops, curr_energy, _ = self.anneal_step(curr_ops, curr_energy, tmp, evaluator, oracle, space)
+            if curr_energy < best_energy:
+                best_ops, best_energy, best_step = curr_ops, curr_energy, self.num_steps
+        self.best_score = -best_energy
+        return best_ops
+
     def run(self, group: ig.Graph, comm: ig.Graph):
+        start_time = time.perf_counter()
+        self.num_evals, self.num_steps, self.stop_reason, self.best_score = 0, 0, None, None
+        self.num_evals_saved, self.num_valid_saved, self.num_tabu = 0, 0, 0
+        self.memo, self.tabu = LRUMemo(self.memo.max_size), deque(maxlen=self.tabu.maxlen)
         max_budget = group.vcount() + (group.ecount() - (group.vcount() - 1))  # max budget
         if self.budget > max_budget:
             self.budget = max_budget
-        comm_top_vertices = [_[0] for _ in sorted([(_['name'], c.degree(_)) for _ in c.vs],
-                                                  key=lambda x: x[1], reverse=True)[:self.budget]]
-        curr_ops = self.gen_valid_ops(group, comm_top_vertices)
-        curr_energy = self.obj_fun(curr_ops, group, comm)
+        space = CandidateSpace(group, comm, self.budget)
+        oracle = ConnectivityOracle(group)
+        curr_ops = self.gen_valid_ops(oracle, space)
+        evaluator = GroupEvaluator(group, comm, self.conv_rate)
+        evaluator.set_ops(curr_ops)
+        curr_energy = -evaluator.score()
+        self.memo.put(self.state_key([space.cid(_) for _ in curr_ops]), curr_energy)
+        if self.time_limit is not None or self.max_steps is not None:
+            return self.anytime_run(curr_ops, evaluator, oracle, space, start_time)
         tot_cond = int(sum([comb(group.vcount(), i) * comb(group.vcount(), i) *
                             comb(group.ecount(), self.budget - i) for i in range(1, self.budget + 1)]))
         print("total condition: {}".format(tot_cond))
@@ -105,13 +201,8 @@ class SimulatedAnnealing:
         counter = 0
         counter_max = 50000
         while tmp >= tmp_min and counter <= counter_max:
-            next_ops = self.disturbance(curr_ops, group, comm_top_vertices)
-            next_energy = self.obj_fun(next_ops, group, comm)
-            delta_energy = next_energy - curr_energy
-            if self.judge(delta_energy, tmp):
-                # accept
-                curr_ops = next_ops
-                curr_energy = next_energy
+            curr_ops, curr_energy, delta_energy = self.anneal_step(curr_ops, curr_energy, tmp, evaluator, oracle,
+                                                                   space)
             if delta_energy < 0:
                 tmp = tmp * alpha  # cool down
                 # print("tmp: {}".format(tmp))
@@ -119,8 +210,23 @@ class SimulatedAnnealing:
                 counter += 1
         # print("best ops: {}, best score: {}".format(curr_ops, -curr_energy))
         # print("run over")
+        self.elapsed, self.stop_reason = time.perf_counter() - start_time, 'cooled'
         return curr_ops
 
+    def report(self) -> dict:
+        """ cost and stop reason of the last run, best score is kept in the anytime mode only """
+        return {'steps': self.num_steps, 'evals': self.num_evals, 'elapsed': self.elapsed,
+                'stop_reason': self.stop_reason, 'best_score': self.best_score, 'memo': self.memo.report(),
+                'evals_saved': self.num_evals_saved, 'valid_checks_saved': self.num_valid_saved,
+                'tabu_rejected': self.num_tabu}
+
+
+# a step is selection except the phases nested in it, moving the evaluator on an accepted memo hit is evaluation
+profiler.register_phases(SimulatedAnnealing, {'gen_valid_ops': 'init', 'disturbance': 'disturbance',
+                                              'anneal_step': 'selection', 'evaluate': 'evaluation',
+                                              'move': 'evaluation', 'judge': 'selection',
+                                              'is_valid_ops': 'validation'})
+
 
 if __name__ == '__main__':
     c = graph_load.load_graph_gml("../data/karate.gml", 'c-')
@@ -129,7 +235,9 @@ if __name__ == '__main__':
     sim_ann = SimulatedAnnealing(4, 0)
     ops = sim_ann.run(g.copy(), c.copy())
     end_time = time.time()
-    print(ops)
+    print(ops, sim_ann.report())
+    # anytime = SimulatedAnnealing(4, 0, time_limit=0.5, patience=5000)  # at most 0.5s
+    # print(anytime.run(g.copy(), c.copy()), anytime.report())
     print("#hidden: {}, {} #time: {}s".format(*graph_cal.cal_hidden_score(
         g.copy(), c.copy(), ops), end_time - start_time))
     print("ok")
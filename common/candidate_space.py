@@ -0,0 +1,90 @@
+import numpy as np
+import igraph as ig
+from common import graph_cal, graph_load
+from common.comm_index import CommunityIndex
+from common.constant import BASE_WEIGHT
+
+
+class CandidateSpace:
+    """ integer coded candidate ops of (group, community, budget)
+
+    candidate id in [0, num_del) is the op of deleting group edge id,
+    candidate id in [num_del, num_del + num_add) is the op of adding an edge of add_pairs[id - num_del].
+    """
+
+    def __init__(self, group: ig.Graph, comm: ig.Graph, budget: int):
+        self.g_names = group.vs['name']
+        c_index = CommunityIndex.of(comm)
+        self.c_top = c_index.top_k(budget)  # top degree vertices of community
+        self.c_names = c_index.top_names(budget)
+        self.out_attraction = 1 + BASE_WEIGHT * c_index.degree[self.c_top]
+        self.del_edges = graph_cal.edge_array(group)  # [(g_v_idx, g_v_idx)]
+        self.add_pairs = np.stack(np.meshgrid(np.arange(len(self.g_names)), np.arange(len(self.c_top)),
+                                              indexing='ij'), axis=-1).reshape(-1, 2)  # [(g_v_idx, c_top_idx)]
+        self.num_del, self.num_add = len(self.del_edges), len(self.add_pairs)
+        self.size = self.num_del + self.num_add
+        # endpoints of each candidate to check conflicts: group vertex and community vertex of add candidates
+        self.add_g_v = [-1] * self.num_del + self.add_pairs[:, 0].tolist()
+        self.add_c_v = [-1] * self.num_del + self.add_pairs[:, 1].tolist()
+        self.ops = [('del', (self.g_names[u], self.g_names[v])) for u, v in self.del_edges.tolist()] + [
+            ('add', (self.g_names[g_v], self.c_names[c_v])) for g_v, c_v in self.add_pairs.tolist()]
+        self.cids = {op: cid for cid, op in enumerate(self.ops)}
+        self.cids.update({('del', op[1][::-1]): cid for cid, op in enumerate(self.ops[:self.num_del])})
+
+    def op(self, cid: int) -> tuple:
+        """ ('del', (g_v_name, g_v_name)) or ('add', (g_v_name, c_v_name)) """
+        return self.ops[cid]
+
+    def cid(self, op: tuple) -> int:
+        return self.cids[op]
+
+    def is_add(self, cids):
+        return np.asarray(cids) >= self.num_del
+
+    def sample(self, size=None):
+        """ draw 'add' or 'del' with equal prob, then a candidate of this kind uniformly """
+        if size is None:
+            if not self.num_del or np.random.rand() < 0.5:
+                return self.num_del + int(np.random.randint(self.num_add))
+            return int(np.random.randint(self.num_del))
+        is_add = np.random.rand(*np.atleast_1d(size)) < 0.5
+        if not self.num_del:
+            is_add[...] = True
+        return np.where(is_add, self.num_del + np.random.randint(0, self.num_add, is_add.shape),
+                        np.random.randint(0, max(self.num_del, 1), is_add.shape))
+
+    def allowed_mask(self, cids) -> np.ndarray:
+        """ candidates that can join cids without repeating an op or reusing a vertex of add ops """
+        cids = np.asarray(cids, dtype=int)
+        mask = np.ones(self.size, dtype=bool)
+        mask[cids] = False
+        chosen_adds = cids[cids >= self.num_del]
+        if len(chosen_adds):
+            mask[self.num_del:] &= ~np.isin(self.add_pairs[:, 0], self.add_pairs[chosen_adds - self.num_del, 0])
+            mask[self.num_del:] &= ~np.isin(self.add_pairs[:, 1], self.add_pairs[chosen_adds - self.num_del, 1])
+        return mask
+
+    def sample_allowed(self, cids, max_tries: int = 8) -> int:
+        """ draw like sample, conditioned on being allowed by cids (rejection first, then by mask) """
+        chosen = set(cids)
+        chosen_g_v = {self.add_g_v[_] for _ in chosen if _ >= self.num_del}
+        chosen_c_v = {self.add_c_v[_] for _ in chosen if _ >= self.num_del}
+        for _ in range(max_tries):
+            cid = self.sample()
+            if cid not in chosen and (cid < self.num_del or (
+                    self.add_g_v[cid] not in chosen_g_v and self.add_c_v[cid] not in chosen_c_v)):
+                return cid
+        allowed = np.flatnonzero(self.allowed_mask(cids))
+        probs = np.where(allowed < self.num_del, 1 / max(self.num_del, 1), 1 / self.num_add)
+        return int(np.random.choice(allowed, p=probs / probs.sum()))
+
+    def to_ops(self, cids) -> tuple:
+        return tuple([self.ops[_] for _ in np.asarray(cids).tolist()])
+
+
+if __name__ == '__main__':
+    c = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
+    g = graph_load.create_full_graph(5, 'g-')
+    space = CandidateSpace(g, c, 6)
+    print(space.num_del, space.num_add, space.to_ops(space.sample(6)))
+    print("ok")
@@ -0,0 +1,58 @@
+import weakref
+import numpy as np
+import igraph as ig
+from common import graph_load
+from common.constant import BASE_WEIGHT
+
+index_memo = graph_load.GraphMemo()  # {(community,): index}
+
+
+class CommunityIndex:
+    """ degree array, name -> id map and top degree vertices of a community, built once per community
+
+    top vertices are ordered by degree (descending) then id, the same order as a stable argsort of -degree.
+    only a prefix of this order is kept and it is extended when a larger k is asked.
+    """
+
+    def __init__(self, comm: ig.Graph):
+        self.comm_ref = weakref.ref(comm)  # the memo drops the index with its community
+        self.degree = np.array(comm.degree())
+        self.top = np.empty(0, dtype=int)  # prefix of the top order
+        self.v_idx = None  # {c_v_name: id}, built at the first lookup by name
+
+    @classmethod
+    def of(cls, comm: ig.Graph):
+        """ shared index of comm, rebuilt after comm is edited """
+        return index_memo.get_or_cal((comm,), lambda: cls(comm))
+
+    def top_k(self, k: int) -> np.ndarray:
+        """ ids of the k top degree vertices """
+        k = min(k, len(self.degree))
+        if k > len(self.top):
+            size = min(max(k, 2 * len(self.top)), len(self.degree))  # grow by doubling
+            threshold = np.partition(self.degree, len(self.degree) - size)[len(self.degree) - size]
+            candidates = np.flatnonzero(self.degree >= threshold)  # every tie of the size-th degree
+            self.top = candidates[np.lexsort((candidates, -self.degree[candidates]))][:size]
+        return self.top[:k]
+
+    def top_names(self, k: int) -> list:
+        return self.comm_ref().vs[self.top_k(k).tolist()]['name']
+
+    def vertex_id(self, c_v_name: str) -> int:
+        if self.v_idx is None:
+            self.v_idx = {v_name: i for i, v_name in enumerate(self.comm_ref().vs['name'])}
+        return self.v_idx[c_v_name]
+
+    def degree_of(self, c_v_name: str) -> int:
+        return int(self.degree[self.vertex_id(c_v_name)])
+
+    def out_attraction(self, c_v_name: str) -> float:
+        return 1 + BASE_WEIGHT * self.degree_of(c_v_name)
+
+
+if __name__ == '__main__':
+    c = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
+    index = CommunityIndex.of(c)
+    print(index.top_names(3), index.top_names(10), CommunityIndex.of(c) is index)
+    print(np.array_equal(index.top_k(c.vcount()), np.argsort(-np.array(c.degree()), kind='stable')))
+    print("ok")
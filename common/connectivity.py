@@ -0,0 +1,108 @@
+import numpy as np
+import igraph as ig
+from common import graph_cal, graph_load
+
+
+class ConnectivityOracle:
+    """ answer whether deleting a set of edges disconnects the group, without copying it
+
+    1. deleting a bridge disconnects the group;
+    2. deleting no edge of a spanning tree keeps the group connected;
+    3. otherwise the tree falls into parts, which must be joined again by the remaining non-tree edges.
+    """
+
+    def __init__(self, group: ig.Graph):
+        self.num_v = group.vcount()
+        self.v_idx = {v_name: i for i, v_name in enumerate(group.vs['name'])}
+        self.edges = graph_cal.edge_array(group)
+        self.e_idx = {(min(u, v), max(u, v)): i for i, (u, v) in enumerate(self.edges.tolist())}
+        self.connected = group.is_connected()
+        self.bridges = set(group.bridges())
+        self.tree_eids = set(group.spanning_tree(return_tree=False))
+        # dfs the spanning tree from vertex 0: a tree edge cuts off the subtree of its child end
+        tree_adj = [[] for _ in range(self.num_v)]
+        for eid in self.tree_eids:
+            u, v = self.edges[eid].tolist()
+            tree_adj[u].append((v, eid))
+            tree_adj[v].append((u, eid))
+        self.child = {}  # {tree eid: child end}
+        self.depth, self.tin, self.tout = [0] * self.num_v, [0] * self.num_v, [0] * self.num_v
+        visited, clock, stack = [False] * self.num_v, 0, [(0, False)] if self.num_v else []
+        while stack:
+            v, done = stack.pop()
+            if done:
+                self.tout[v] = clock - 1
+                continue
+            visited[v], self.tin[v] = True, clock
+            clock += 1
+            stack.append((v, True))
+            for w, eid in tree_adj[v]:
+                if not visited[w]:
+                    self.child[eid], self.depth[w] = w, self.depth[v] + 1
+                    stack.append((w, False))
+        self.non_tree_edges = [(eid, self.tin[u], self.tin[v]) for eid, (u, v) in enumerate(self.edges.tolist())
+                               if eid not in self.tree_eids]  # [(eid, tin of u, tin of v)]
+
+    def eid(self, edge: tuple) -> int:
+        u, v = self.v_idx[edge[0]], self.v_idx[edge[1]]
+        return self.e_idx[(min(u, v), max(u, v))]
+
+    def is_connected_after(self, del_eids) -> bool:
+        """ is the group still connected after deleting edges of del_eids """
+        if not self.connected:
+            return False
+        cut_eids = []
+        for eid in del_eids:
+            if eid in self.bridges:
+                return False
+            if eid in self.tree_eids:
+                cut_eids.append(eid)
+        if not len(cut_eids):
+            return True
+        # tree parts: a vertex belongs to the deepest cut subtree containing it (0 is the root part)
+        cuts = sorted([(self.depth[self.child[_]], self.child[_]) for _ in cut_eids], reverse=True)
+        cuts = [(part, self.tin[c], self.tout[c]) for part, (_, c) in enumerate(cuts, 1)]
+
+        def part_of(tin: int) -> int:
+            for part, c_tin, c_tout in cuts:
+                if c_tin <= tin <= c_tout:
+                    return part
+            return 0
+
+        # union-find on parts joined by the remaining non-tree edges
+        parent = list(range(len(cuts) + 1))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        num_parts = len(parent)
+        del_eids = set(del_eids)
+        for eid, u_tin, v_tin in self.non_tree_edges:
+            if eid in del_eids:
+                continue
+            root_u, root_v = find(part_of(u_tin)), find(part_of(v_tin))
+            if root_u != root_v:
+                parent[root_u] = root_v
+                num_parts -= 1
+                if num_parts == 1:
+                    return True
+        return False
+
+    def is_connected_after_ops(self, ops) -> bool:
+        """ is the group still connected after the 'del' ops """
+        return self.is_connected_after([self.eid(op[1]) for op in ops if op[0] == 'del'])
+
+    def batch_is_connected_after_ops(self, population: list) -> np.ndarray:
+        """ connectivity after the 'del' ops of each dna in population """
+        return np.array([self.is_connected_after_ops(_) for _ in population], dtype=bool)
+
+
+if __name__ == '__main__':
+    g = graph_load.create_full_graph(4, 'g-')
+    oracle = ConnectivityOracle(g)
+    print(oracle.is_connected_after_ops([('del', ('g-0', 'g-1')), ('del', ('g-0', 'g-2'))]),
+          oracle.is_connected_after_ops([('del', ('g-0', 'g-1')), ('del', ('g-0', 'g-2')), ('del', ('g-0', 'g-3'))]))
+    print("ok")
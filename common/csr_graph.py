@@ -0,0 +1,132 @@
+import itertools
+import numpy as np
+import igraph as ig
+from common import graph_load
+
+COMMENT_PREFIXES = (b'#', b'%')
+
+
+class CSRGraph:
+    """ undirected simple graph as csr adjacency: neighbours of vertex v are indices[indptr[v]:indptr[v + 1]]
+
+    ids[v] is the id of vertex v in the source edge list.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, ids: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.ids = ids
+
+    @property
+    def num_v(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def num_e(self) -> int:
+        return len(self.indices) // 2
+
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def neighbors(self, v: int) -> np.ndarray:
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    def edge_array(self) -> np.ndarray:
+        """ [(u, v)] with u < v, sorted """
+        rows = np.repeat(np.arange(self.num_v, dtype=self.indices.dtype), self.degree())
+        upper = rows < self.indices
+        return np.stack([rows[upper], self.indices[upper]], axis=1)
+
+    def to_igraph(self, vertex_name_prefix: str = None) -> ig.Graph:
+        """ igraph copy of the graph, vertices named by prefix and index if a prefix is given """
+        g = ig.Graph(n=self.num_v, edges=self.edge_array())
+        return graph_load.name_vertices(g, vertex_name_prefix) if vertex_name_prefix is not None else g
+
+
+class IdMap:
+    """ map source ids of vertices to 0..n-1 in the order of first appearance """
+
+    def __init__(self):
+        self.codes = {}
+        self.ids = []
+
+    def encode(self, ids: np.ndarray) -> np.ndarray:
+        uniq, inverse = np.unique(ids, return_inverse=True)  # dict lookups only once for each id of a chunk
+        mapped = np.empty(len(uniq), dtype=np.int64)
+        for i, v_id in enumerate(uniq.tolist()):
+            code = self.codes.get(v_id)
+            if code is None:
+                code = self.codes[v_id] = len(self.ids)
+                self.ids.append(v_id)
+            mapped[i] = code
+        return mapped[inverse.reshape(-1)]
+
+    def to_bytes(self):
+        """ turn integer ids into the bytes they were read from, codes are kept """
+        self.ids = [str(_).encode() for _ in self.ids]
+        self.codes = {v_id: code for code, v_id in enumerate(self.ids)}
+
+
+def read_chunks(file_path: str, chunk_lines: int):
+    """ [(source id, target id)] arrays of chunk_lines lines each, blank and comment lines skipped """
+    with open(file_path, 'rb') as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_lines))
+            if not len(lines):
+                break
+            pairs = [_.split()[:2] for _ in lines if _.strip() and not _.lstrip().startswith(COMMENT_PREFIXES)]
+            yield np.array([_ for _ in pairs if len(_) == 2], dtype=bytes).reshape(-1, 2)
+
+
+def edge_keys(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """ sorted unique keys of undirected edges without self loops, key = min end << 32 | max end """
+    keep = u != v
+    u, v = u[keep], v[keep]
+    return np.unique((np.minimum(u, v) << 32) | np.maximum(u, v))
+
+
+def load_edge_list(file_path: str, chunk_lines: int = 1 << 20, int_ids: bool = None) -> CSRGraph:
+    """ stream an edge list into a csr graph: ids are remapped, duplicated edges and self loops are dropped
+
+    a chunk is parsed, remapped and deduplicated on its own, so besides the graph only one chunk of text is held.
+    integer ids are ordered by value (a dense 0..n-1 list keeps its vertex ids), other ids by first appearance.
+    int_ids=None detects integer ids chunk by chunk: once a chunk has another id, the whole file falls back to
+    bytes ids.
+    """
+    id_map, keys, detect = IdMap(), [], int_ids is None
+    for chunk in read_chunks(file_path, chunk_lines):
+        if detect and int_ids is not False and len(chunk):
+            digits = bool(np.char.isdigit(chunk).all())
+            if int_ids and not digits:
+                id_map.to_bytes()
+            int_ids = digits
+        ids = chunk.astype(np.int64) if int_ids else chunk
+        codes = id_map.encode(ids.ravel()).reshape(-1, 2)
+        keys.append(edge_keys(codes[:, 0], codes[:, 1]))
+        if len(keys) > 8:  # merge, so duplicated edges across chunks do not pile up
+            keys = [np.unique(np.concatenate(keys))]
+    keys = np.unique(np.concatenate(keys)) if len(keys) else np.empty(0, dtype=np.int64)
+    ids = np.array(id_map.ids)
+    u, v = keys >> 32, keys & 0xffffffff
+    if int_ids and len(ids):  # relabel by id value
+        order = np.argsort(ids, kind='stable')
+        rank = np.empty(len(ids), dtype=np.int64)
+        rank[order] = np.arange(len(ids))
+        ids, keys = ids[order], edge_keys(rank[u], rank[v])
+        u, v = keys >> 32, keys & 0xffffffff
+    num_v = len(ids)
+    dtype = np.int32 if num_v < 1 << 31 else np.int64
+    # keys are sorted by (u, v): in a row, the smaller neighbours of the first half come sorted, then the larger
+    rows, cols = np.concatenate([v, u]), np.concatenate([u, v])
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(num_v + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_v), out=indptr[1:])
+    return CSRGraph(indptr, cols[order].astype(dtype), ids)
+
+
+if __name__ == '__main__':
+    csr = load_edge_list("../data/facebook.txt", chunk_lines=10000)
+    g = graph_load.load_graph_txt("../data/facebook.txt", 'c-')
+    print(csr.num_v, csr.num_e, g.vcount(), g.ecount())
+    print(sorted(csr.to_igraph().get_edgelist()) == sorted([tuple(sorted(_)) for _ in g.get_edgelist()]))
+    print("ok")
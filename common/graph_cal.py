@@ -1,108 +1,216 @@
+import numpy as np
 import igraph as ig
-import _pickle as pickle
+from functools import lru_cache
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
 from common.constant import BASE_WEIGHT
 from common import graph_load
 
+INIT_WEIGHT = 1 / 2  # weight of the first bfs layer
+MAX_BLOCK_SIZE = 1 << 22  # max (sources x edges) entries reduced at once
+MAX_DENSE_V = 4096  # max vertices to bfs on a dense adjacency matrix
+MAX_DENSE_LAYERS = 32  # max bfs layers to expand on a dense adjacency matrix
 
-def cal_convenience_of_graph(g: ig.Graph) -> float:
-    """ cal avg closeness of graph and normalize it """
-    return sum(g.closeness()) / len(g.closeness())
 
+def edge_array(g: ig.Graph) -> np.ndarray:
+    """ edges of graph as an int array of shape (ecount, 2) """
+    return np.array(g.get_edgelist(), dtype=np.int64).reshape(-1, 2)
 
-def cal_as_of_vertex(g: ig.Graph, vertex_name: str) -> float:
-    """ cal the attraction of a graph to a vertex """
-    vertex_idx = g.vs.find(vertex_name).index  # find edges or vertices using index instead of name
-    as_of_v = 0
-    # first layer search
-    weight = 1/2  # init weight
-    first_layer_edges = g.incident(vertex_idx)
-    vertices_to_search = g.neighbors(vertex_idx)
-    edges_searched = {_ for _ in first_layer_edges}
-    vertices_searched = {vertex_idx}
-    as_of_v += (len(first_layer_edges) * weight)
-    # loop to traverse all edges
+
+def adj_matrix(num_v: int, edges: np.ndarray) -> np.ndarray:
+    """ dense symmetric adjacency matrix for matmul bfs """
+    adj = np.zeros((num_v, num_v), dtype=np.float32)
+    adj[edges[:, 0], edges[:, 1]] = 1
+    adj[edges[:, 1], edges[:, 0]] = 1
+    return adj
+
+
+def dense_bfs(adj: np.ndarray, sources: np.ndarray):
+    """ bfs of all sources at once by expanding frontiers with matmul (None if the graph is too deep) """
+    dist = np.full((len(sources), len(adj)), np.inf)
+    dist[np.arange(len(sources)), sources] = 0
+    reached = np.isfinite(dist)
+    frontier, layer = reached.astype(np.float32), 0
     while True:
-        # print("# search vertices: {}".format([g.vs['name'][_] for _ in vertices_to_search]))
-        weight *= BASE_WEIGHT  # weight decrease with higher layer
-        next_layer_edges = []  # store adjacent edges of vertices (allow to duplicate)
-        next_layer_vertices = []  # store neighbors vertices of vertices (allow to duplicate)
-        for v in vertices_to_search:
-            next_layer_edges.extend(g.incident(v))
-            next_layer_vertices.extend(g.neighbors(v))
-            vertices_searched.add(v)  # update vertices already searched
-        as_of_v += (weight * len(set(next_layer_edges) - edges_searched))  # weighted summation for new edges
-        vertices_to_search = list(set(next_layer_vertices) - vertices_searched)  # update candidate vertices to search
-        edges_searched = edges_searched.union(set(next_layer_edges))  # update edges already searched
-        if len(edges_searched) == g.ecount():
+        layer += 1
+        next_frontier = (frontier @ adj) > 0  # expand all bfs frontiers by one layer at once
+        next_frontier &= ~reached
+        if not next_frontier.any():
             break
-    return as_of_v
+        if layer > MAX_DENSE_LAYERS:
+            return None
+        dist[next_frontier] = layer
+        reached |= next_frontier
+        frontier = next_frontier.astype(np.float32)
+    return dist
 
 
-def cal_safeness_of_graph(g: ig.Graph) -> float:
-    """ cal safeness of graph: looseness of the graph (inverse to attraction) """
+def sparse_bfs(num_v: int, edges: np.ndarray, sources: np.ndarray) -> np.ndarray:
+    """ bfs of each source over the csr adjacency """
+    adj = csr_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(num_v, num_v))
+    return shortest_path(adj, directed=False, unweighted=True, indices=sources).reshape(-1, num_v)
+
+
+def cal_dist_matrix(g: ig.Graph, sources=None, edges: np.ndarray = None) -> np.ndarray:
+    """ batched bfs from sources (all vertices by default) over the adjacency of graph (inf if unreachable) """
     num_v = g.vcount()
+    edges = edge_array(g) if edges is None else edges
+    sources = np.arange(num_v) if sources is None else np.atleast_1d(sources)
+    dist = dense_bfs(adj_matrix(num_v, edges), sources) if num_v <= MAX_DENSE_V else None
+    return sparse_bfs(num_v, edges, sources) if dist is None else dist  # sparse for large or deep graphs
+
+
+def cal_attraction(dist: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """ attraction of each bfs source: edge weight decreases with the layer of its nearer end """
+    att = np.zeros(len(dist))
+    if not len(edges):
+        return att
+    block = max(1, MAX_BLOCK_SIZE // len(edges))
+    for i in range(0, len(dist), block):
+        layer = np.minimum(dist[i:i + block, edges[:, 0]], dist[i:i + block, edges[:, 1]])
+        att[i:i + block] = (INIT_WEIGHT * np.power(BASE_WEIGHT, layer)).sum(axis=1)  # unreachable edges add 0
+    return att
+
+
+def cal_closeness(dist: np.ndarray) -> np.ndarray:
+    """ closeness of each bfs source (only reachable vertices are considered like igraph) """
+    reachable = np.isfinite(dist)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (reachable.sum(axis=1) - 1) / np.where(reachable, dist, 0).sum(axis=1)
+
+
+@lru_cache(maxsize=None)
+def min_max_avg_as(num_v: int) -> (float, float):
+    """ closed-form avg attraction of line graph (min) and complete graph (max) with num_v vertices """
+    # line graph: vertex i attracts i edges on one side and (num_v - 1 - i) on the other side
+    if BASE_WEIGHT == 1:
+        min_avg_as = INIT_WEIGHT * (num_v - 1)
+    else:
+        geo_sum = (num_v - (1 - BASE_WEIGHT ** num_v) / (1 - BASE_WEIGHT)) / (1 - BASE_WEIGHT)
+        min_avg_as = 2 * INIT_WEIGHT * geo_sum / num_v
     # complete graph
-    # max_avg_as = cal_as_of_vertex(graph_load.create_full_graph(num_v, 'complete-'), 'complete-0')
     max_avg_as = (num_v - 1) * 1 + (num_v * (num_v - 1) / 2 - (num_v - 1)) * BASE_WEIGHT
-    # line graph
-    min_avg_as = sum([cal_as_of_vertex(graph_load.create_multi_tree(
-        1, num_v - 1, 'line-'), 'line-' + str(_)) for _ in range(num_v)]) / num_v
-    avg_as = sum([cal_as_of_vertex(g, v_name) for v_name in g.vs['name']]) / num_v
+    return min_avg_as, max_avg_as
+
+
+def norm_safeness(avg_as: float, num_v: int) -> float:
+    """ normalize the avg attraction of a graph with num_v vertices to safeness """
+    min_avg_as, max_avg_as = min_max_avg_as(num_v)
     norm_avg_as = (avg_as - min_avg_as) / (
             max_avg_as - min_avg_as) if num_v != 2 else 0
     return 1 - norm_avg_as
 
 
-def cal_hidden_score(group: ig.Graph, community: ig.Graph, ops: list) -> (list, float):
-    """ cal hidden score: [0, 1] """
-    new_comm = graph_load.union_two_graphs(community, group)
-    for op in ops:
-        new_comm.add_edge(*op[1]) if op[0] == 'add' else new_comm.delete_edges([op[1]])
+def cal_group_metrics(g: ig.Graph, edges: np.ndarray = None) -> (np.ndarray, float, float):
+    """ fused kernel: attraction of all vertices, safeness and convenience from one batched bfs
+
+    edges: edge array to use instead of the edges of g (e.g. the remaining edges after deletion)
+    """
+    edges = edge_array(g) if edges is None else edges
+    dist = cal_dist_matrix(g, edges=edges)
+    att = cal_attraction(dist, edges)
+    return att, norm_safeness(att.mean(), g.vcount()), cal_closeness(dist).mean()
+
+
+def cal_convenience_of_graph(g: ig.Graph) -> float:
+    """ cal avg closeness of graph and normalize it """
+    return cal_closeness(cal_dist_matrix(g)).mean()
+
+
+def cal_as_of_vertex(g: ig.Graph, vertex_name: str) -> float:
+    """ cal the attraction of a graph to a vertex """
+    vertex_idx = g.vs.find(vertex_name).index  # find edges or vertices using index instead of name
+    edges = edge_array(g)
+    return cal_attraction(cal_dist_matrix(g, vertex_idx, edges), edges)[0]
+
+
+def cal_as_of_vertices(g: ig.Graph) -> np.ndarray:
+    """ cal the attraction of a graph to each of its vertices """
+    edges = edge_array(g)
+    return cal_attraction(cal_dist_matrix(g, edges=edges), edges)
+
+
+def cal_safeness_of_graph(g: ig.Graph) -> float:
+    """ cal safeness of graph: looseness of the graph (inverse to attraction) """
+    edges = edge_array(g)
+    return norm_safeness(cal_attraction(cal_dist_matrix(g, edges=edges), edges).mean(), g.vcount())
+
+
+def cal_group_clusters(group: ig.Graph, community: ig.Graph, ops: list) -> (list, int):
+    """ cluster the union of community and group after ops
+
+    return [(num of group vertices, num of vertices)] of clusters containing group vertices, and num of clusters
+    """
+    new_comm = graph_load.apply_ops(graph_load.cached_union_two_graphs(community, group), ops)
     cluster_c = new_comm.community_leading_eigenvector()
     # cluster_c = new_comm.community_label_propagation()
     # ig.plot(cluster_c, "../data/result/community_with_group_cluster.pdf")
-    clusters = [sub_graph.vs['name'] for sub_graph in cluster_c.subgraphs()]
-    print("clusters: {}".format(len(clusters)))
-    group_vs = group.vs['name']
-    g_clusters = []
-    for cluster in clusters:
-        num_in_cluster = len([_ for _ in cluster if _ in group_vs])
-        if num_in_cluster:
-            g_clusters.append((num_in_cluster, len(cluster)))
+    membership = np.array(cluster_c.membership)
+    sizes = np.bincount(membership, minlength=len(cluster_c))
+    in_group = np.bincount(membership[community.vcount():], minlength=len(cluster_c))  # group vertices are last
+    g_clusters = [(int(in_group[i]), int(sizes[i])) for i in np.flatnonzero(in_group)]
+    return g_clusters, len(cluster_c)
+
+
+def hidden_score_of_clusters(g_clusters: list, num_g_v: int) -> float:
     # hidden_score = 1 - sum([(i[0] / i[1]) * (i[0] / group.vcount()) for i in g_cluster]) / len(g_cluster)
-    hidden_score = 1 - sum([(i[0] / i[1]) * (i[0] / group.vcount()) for i in g_clusters])
-    return g_clusters, hidden_score
+    return 1 - sum([(i[0] / i[1]) * (i[0] / num_g_v) for i in g_clusters])
+
+
+def cal_hidden_score(group: ig.Graph, community: ig.Graph, ops: list) -> (list, float):
+    """ cal hidden score: [0, 1] """
+    g_clusters, _ = cal_group_clusters(group, community, ops)
+    return g_clusters, hidden_score_of_clusters(g_clusters, group.vcount())
+
+
+def detect_groups(g: ig.Graph) -> list:
+    """ cluster g once by leading eigenvector, return (group vertex ids, community vertex ids) of each cluster """
+    membership = np.array(g.community_leading_eigenvector().membership)
+    return [(np.flatnonzero(membership == i), np.flatnonzero(membership != i)) for i in range(membership.max() + 1)]
+
+
+def sub_graph_of(num_v: int, edges: np.ndarray, v_ids: np.ndarray, vertex_name_prefix: str) -> ig.Graph:
+    """ subgraph induced by v_ids, edges keep their order in the edge array of the whole graph """
+    rank = np.full(num_v, -1, dtype=np.int64)
+    rank[v_ids] = np.arange(len(v_ids))
+    sub_edges = rank[edges]
+    sub_g = ig.Graph(len(v_ids), sub_edges[(sub_edges >= 0).all(axis=1)].tolist())
+    graph_load.name_vertices(sub_g, vertex_name_prefix)
+    return sub_g
+
+
+def materialize_group(g: ig.Graph, g_ids: np.ndarray, c_ids: np.ndarray, edges: np.ndarray = None) -> (
+        ig.Graph, ig.Graph):
+    """ (community, group) of a detected group, vertices renamed 'c-i' and 'g-i' in id order """
+    edges = edge_array(g) if edges is None else edges
+    sub_group = g.induced_subgraph(g_ids.tolist())  # same as the subgraphs of clusters
+    graph_load.name_vertices(sub_group, 'g-')
+    return sub_graph_of(g.vcount(), edges, c_ids, 'c-'), sub_group
 
 
 def gen_groups_of_graph(g: ig.Graph):
-    clusters = g.community_leading_eigenvector()
-    subs = []
-    for sub_graph in clusters.subgraphs():
-        sub_comm = g.copy()
-        sub_comm.delete_vertices([_['name'] for _ in sub_graph.vs])
-        sub_comm.vs['name'] = ['c-' + str(i) for i in range(sub_comm.vcount())]  # rename
-        sub_graph.vs['name'] = ['g-' + str(i) for i in range(sub_graph.vcount())]
-        subs.append((sub_comm, sub_graph))
-    return subs
-
-
-def gen_min_max_as_file():
-    """ pre generate the file of min-max-as value """
-    min_max_as = {}
-    for num_v in range(2, 500):
-        max_avg_as = cal_as_of_vertex(graph_load.create_full_graph(num_v, 'complete-'), 'complete-0')
-        min_avg_as = sum([cal_as_of_vertex(graph_load.create_multi_tree(
-            1, num_v - 1, 'line-'), 'line-' + str(_)) for _ in range(num_v)]) / num_v
-        min_max_as[num_v] = (min_avg_as, max_avg_as)
-        print("cal {} done".format(num_v), end='\r', flush=True)
-    with open("../data/pre/min_max_as.pkl", "wb") as fw:
-        pickle.dump(min_max_as, fw)
-    print("gen min_max_as_file done")
+    """ (community, group) of each cluster, built from the edge array of g instead of a copy of g for each """
+    edges = edge_array(g)
+    return [materialize_group(g, g_ids, c_ids, edges) for g_ids, c_ids in detect_groups(g)]
+
+
+def check_min_max_as(max_num_v: int) -> float:
+    """ check closed-form min avg attraction against bfs on line graphs, return the max abs error """
+    num_vs = set(range(2, min(max_num_v, 64) + 1))
+    if max_num_v > 64:
+        num_vs |= set(np.geomspace(64, max_num_v, 16, dtype=int).tolist())
+    max_err = 0
+    for num_v in sorted(num_vs):
+        line = graph_load.create_multi_tree(1, num_v - 1, 'line-')
+        bfs_min_avg_as = cal_as_of_vertices(line).mean()
+        max_err = max(max_err, abs(bfs_min_avg_as - min_max_avg_as(num_v)[0]))
+        print("check {} done".format(num_v), end='\r', flush=True)
+    print("check min_max_as done, max error: {}".format(max_err))
+    return max_err
 
 
 if __name__ == '__main__':
-    # gen_min_max_as_file()
-    # with open("../data/pre/min_max_as.pkl", "rb") as fr: print(pickle.load(fr))
+    # check_min_max_as(3000)
 
     # k_graph = graph_load.create_full_graph(3, 'node-')  # complete graph
     # print("complete graph safeness: {}".format(cal_safeness_of_graph(k_graph)))
@@ -1,64 +1,192 @@
+import os
+import json
+import hashlib
+import weakref
+import numpy as np
 import igraph as ig
 
+CACHE_VERSION = 1  # version of the binary snapshot format
+
+
+def edit_version(g: ig.Graph) -> int:
+    """ number of in-place edits of g made through touch """
+    return g.__dict__.get('edit_version', 0)
+
+
+def touch(g: ig.Graph) -> ig.Graph:
+    """ mark g as edited in place, so values derived from it are rebuilt """
+    g.edit_version = edit_version(g) + 1
+    return g
+
+
+class GraphMemo:
+    """ memo of values derived from graphs, keyed by the graphs themselves
+
+    an entry holds no reference to its graphs and is dropped when one of them is collected, so an id is never
+    matched with a value of a dead graph; it is rebuilt when the size or the edit version of a graph changes,
+    so edits made directly through igraph instead of apply_ops must touch the graph.
+    values must not hold their graphs either, or the graphs are never collected.
+    """
+
+    def __init__(self):
+        self.data = {}  # {ids of graphs: (stamps of graphs, value)}
+
+    def __len__(self):
+        return len(self.data)
+
+    def get_or_cal(self, graphs: tuple, cal_fun):
+        key = tuple(id(_) for _ in graphs)
+        stamps = tuple((_.vcount(), _.ecount(), edit_version(_)) for _ in graphs)
+        entry = self.data.get(key)
+        if entry is not None and entry[0] == stamps:
+            return entry[1]
+        if entry is None:
+            for g in graphs:
+                weakref.finalize(g, self.data.pop, key, None)
+        value = cal_fun()
+        self.data[key] = (stamps, value)
+        return value
+
+
+union_memo = GraphMemo()  # {(g1, g2): union graph}
+
+
+def file_hash(file_path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def cache_paths(file_path: str) -> (str, str):
+    """ binary snapshot of edges and its json sidecar, next to the source file """
+    return file_path + '.edges.npy', file_path + '.cache.json'
+
+
+def write_json(file_path: str, obj: dict):
+    tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, file_path)  # atomic, in case pool workers write at the same time
+
+
+def load_cache(file_path: str):
+    """ graph from the snapshot of file_path, None if it is missing or the source changed (mtime, then hash) """
+    edges_path, meta_path = cache_paths(file_path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        stat = os.stat(file_path)
+        if meta['version'] != CACHE_VERSION or meta['size'] != stat.st_size:
+            return None
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            if meta['sha1'] != file_hash(file_path):
+                return None
+            meta['mtime_ns'] = stat.st_mtime_ns  # touched but same content
+            write_json(meta_path, meta)
+        # the (m, 2) array goes to igraph as it is, no python list of pairs is built
+        return ig.Graph(n=meta['num_v'], edges=np.load(edges_path, mmap_mode='r'), directed=meta['directed'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cache(file_path: str, g: ig.Graph):
+    """ write the edges of g as the snapshot of file_path (skipped if the directory is read only) """
+    edges_path, meta_path = cache_paths(file_path)
+    meta = {'version': CACHE_VERSION, 'num_v': g.vcount(), 'directed': g.is_directed(),
+            'size': os.stat(file_path).st_size, 'mtime_ns': os.stat(file_path).st_mtime_ns,
+            'sha1': file_hash(file_path)}
+    tmp_path = "{}.{}.tmp.npy".format(edges_path, os.getpid())
+    try:
+        np.save(tmp_path, np.array(g.get_edgelist(), dtype=np.int32).reshape(-1, 2))
+        os.replace(tmp_path, edges_path)
+        write_json(meta_path, meta)
+    except OSError:
+        pass
+
+
+def load_graph_cached(file_path: str, read_fun) -> ig.Graph:
+    """ structure of graph in file_path from its binary snapshot, parsed by read_fun(file_path) on a miss
+
+    only vertices and edges are kept, other attributes of the source are dropped.
+    """
+    g = load_cache(file_path)
+    if g is None:
+        g = read_fun(file_path)
+        save_cache(file_path, g)
+    return g
+
+
+def name_vertices(g: ig.Graph, vertex_name_prefix: str) -> ig.Graph:
+    """ name vertices by prefix and index, igraph needs the names materialized for lookups by name """
+    g.vs['name'] = [vertex_name_prefix + str(i) for i in range(g.vcount())]
+    return touch(g)
+
 
 def load_graph_gml(file_path: str, vertex_name_prefix: str) -> ig.Graph:
     """ load graph in gml format (rename if the attribute of 'name' exists) """
     # g = ig.load(file_path, format='gml')
-    g = ig.Graph.Read_GML(file_path)
-    g.vs['name'] = [vertex_name_prefix + str(i) for i in range(g.vcount())]
-    return g
+    g = load_graph_cached(file_path, ig.Graph.Read_GML)
+    return name_vertices(g, vertex_name_prefix)
 
 
 def load_graph_txt(file_path: str, vertex_name_prefix: str) -> ig.Graph:
     """ .txt: each record of file has the format of [source-vertex, target-vertex] """
-    g = ig.Graph.Read_Edgelist(file_path, directed=False)
-    g.vs['name'] = [vertex_name_prefix + str(_) for _ in range(g.vcount())]
-    return g
+    g = load_graph_cached(file_path, lambda _: ig.Graph.Read_Edgelist(_, directed=False))
+    return name_vertices(g, vertex_name_prefix)
 
 
 def create_full_graph(k: int, vertex_name_prefix: str) -> ig.Graph:
     """ create complete graph """
     g = ig.Graph.Full(k)
-    g.vs['name'] = [vertex_name_prefix + str(i) for i in range(k)]
-    return g
+    return name_vertices(g, vertex_name_prefix)
 
 
 def create_star_graph(k: int, vertex_name_prefix: str) -> ig.Graph:
     """ create star graph """
     g = ig.Graph.Star(k)
-    g.vs['name'] = [vertex_name_prefix + str(i) for i in range(k)]
-    return g
+    return name_vertices(g, vertex_name_prefix)
 
 
 def create_multi_tree(children: int, depth: int, vertex_name_prefix: str) -> ig.Graph:
     """ create multi tree like binary tree graph or line graph """
     num_vertices = int((1 - pow(children, depth + 1)) / (1 - children)) if children != 1 else depth + 1
     g = ig.Graph.Tree(num_vertices, children)
-    g.vs['name'] = [vertex_name_prefix + str(i) for i in range(g.vcount())]
-    return g
+    return name_vertices(g, vertex_name_prefix)
 
 
 def create_barabasi_albert_graph(num_v: int, num_e_of_each_vertex: int, vertex_name_prefix: str) -> ig.Graph:
     """ create a graph based on the Barabasi-Albert model """
     g = ig.Graph.Barabasi(num_v, num_e_of_each_vertex)
-    g.vs['name'] = [vertex_name_prefix + str(i) for i in range(g.vcount())]
-    return g
+    return name_vertices(g, vertex_name_prefix)
 
 
 def union_two_graphs(g1: ig.Graph, g2: ig.Graph) -> ig.Graph:
-    """ union two graphs to one (assume that graph has attribute of 'name')"""
-    union_g = ig.Graph()
-    union_g.add_vertices(g1.vs['name'])
-    for e in g1.es:
-        source, target = g1.vs[e.source]['name'], g1.vs[e.target]['name']
-        union_g.add_edge(source, target)
-    union_g.add_vertices(g2.vs['name'])
-    for e in g2.es:
-        source, target = g2.vs[e.source]['name'], g2.vs[e.target]['name']
-        union_g.add_edge(source, target)
+    """ union two graphs to one (assume that graph has attribute of 'name')
+
+    vertices of g1 then g2, edges of g1 then g2, built from edge arrays at once.
+    """
+    edges = np.array(g1.get_edgelist() + g2.get_edgelist(), dtype=int).reshape(-1, 2)
+    edges[g1.ecount():] += g1.vcount()
+    union_g = ig.Graph(g1.vcount() + g2.vcount(), edges.tolist())
+    union_g.vs['name'] = g1.vs['name'] + g2.vs['name']
     return union_g
 
 
+def cached_union_two_graphs(g1: ig.Graph, g2: ig.Graph) -> ig.Graph:
+    """ copy of the union of two graphs, built once for each pair of graphs until one of them is edited """
+    return union_memo.get_or_cal((g1, g2), lambda: union_two_graphs(g1, g2)).copy()
+
+
+def apply_ops(g: ig.Graph, ops: list) -> ig.Graph:
+    """ apply ops of ('add' or 'del', (v_name, v_name)) on g in place by a batch delete and a batch add """
+    del_es = [op[1] for op in ops if op[0] == 'del']
+    if len(del_es):
+        g.delete_edges(g.get_eids(del_es))
+    g.add_edges([op[1] for op in ops if op[0] == 'add'])
+    return touch(g)
+
 if __name__ == '__main__':
     k_graph = create_full_graph(3, 'node-')
     multi_tree = create_multi_tree(2, 3, 'node-')
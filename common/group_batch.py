@@ -0,0 +1,63 @@
+import os
+import time
+import random
+import numpy as np
+import igraph as ig
+from collections import namedtuple
+from common import graph_cal, graph_load
+from common.worker_pool import WorkerPool
+
+# a detected group of graph as vertex ids: its own vertices and the rest of graph as its community
+GroupView = namedtuple('GroupView', ['cluster', 'g_ids', 'c_ids'])
+
+
+def detect_groups(g: ig.Graph) -> list:
+    """ cluster g once, return a view of each cluster (no graph is copied) """
+    return [GroupView(i, g_ids, c_ids) for i, (g_ids, c_ids) in enumerate(graph_cal.detect_groups(g))]
+
+
+def init_worker(g: ig.Graph, solver) -> dict:
+    """ graph, its edge array and solver of a worker """
+    return {'graph': g, 'edges': graph_cal.edge_array(g), 'solver': solver}
+
+
+def penetrate_group(state: dict, view: GroupView, budget: int, conv_rate: float, seed: int) -> dict:
+    """ run the solver of worker on a view, return its row of the result table """
+    random.seed(seed)
+    np.random.seed(seed)
+    comm, group = graph_cal.materialize_group(state['graph'], view.g_ids, view.c_ids, state['edges'])
+    start_time = time.perf_counter()
+    ops = list(state['solver'](group.copy(), comm.copy(), budget, conv_rate))
+    wall_time = time.perf_counter() - start_time
+    random.seed(seed)  # leading eigenvector starts from a random vector
+    g_clusters, hidden_score = graph_cal.cal_hidden_score(group, comm, ops)
+    return {'cluster': view.cluster, 'group_v': group.vcount(), 'group_e': group.ecount(), 'comm_v': comm.vcount(),
+            'comm_e': comm.ecount(), 'ops': ops, 'g_clusters': g_clusters, 'hidden_score': hidden_score,
+            'wall_time': wall_time}
+
+
+def penetrate_all(g: ig.Graph, solver, budget: int, conv_rate: float, views: list = None, processes: int = None,
+                  seed: int = 0) -> list:
+    """ penetrate every detected group of g with solver(group, comm, budget, conv_rate) -> ops
+
+    groups are detected once (or given as views), each worker gets g once and builds its pairs from the views.
+    solvers must not start process pools of their own, and must be picklable where processes are spawned.
+    return the rows of the result table by cluster.
+    """
+    if views is None:
+        random.seed(seed)  # leading eigenvector starts from a random vector
+        views = detect_groups(g)
+    processes = processes if processes else min(len(views), os.cpu_count())
+    args = [(_, budget, conv_rate, seed) for _ in views]
+    with WorkerPool(processes, init_worker, (g, solver)) as pool:
+        return pool.map(penetrate_group, args)
+
+
+if __name__ == '__main__':
+    from baseline.greedy_search import GreedySearch
+    karate = graph_load.load_graph_gml("../data/karate.gml", 'c-')
+    rows = penetrate_all(karate, lambda group, comm, budget, conv_rate: GreedySearch(budget, conv_rate).run(
+        comm, group), budget=4, conv_rate=0, processes=2)
+    for row in rows:
+        print("cluster {cluster}: group ({group_v}, {group_e}), hidden score {hidden_score}".format(**row))
+    print("ok")
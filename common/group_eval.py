@@ -0,0 +1,159 @@
+import numpy as np
+import igraph as ig
+from common import graph_cal, graph_load
+from common.comm_index import CommunityIndex
+from common.constant import BASE_WEIGHT
+
+
+class GroupEvaluator:
+    """ hold the state of a group after ops and score single op moves incrementally
+
+    ops: ('del', (g_v_name, g_v_name)) deletes an edge inside group,
+         ('add', (g_v_name, c_v_name)) adds an edge from group to community.
+    all changes are journaled, so a move can be rolled back to any checkpoint.
+    """
+
+    def __init__(self, group: ig.Graph, comm: ig.Graph, conv_rate: float):
+        self.group = group
+        self.comm = comm
+        self.c_index = CommunityIndex.of(comm)
+        self.conv_rate = conv_rate
+        self.num_v = group.vcount()
+        self.v_idx = {v_name: i for i, v_name in enumerate(group.vs['name'])}
+        self.edges = graph_cal.edge_array(group)
+        self.e_idx = {(min(u, v), max(u, v)): i for i, (u, v) in enumerate(self.edges.tolist())}
+        self.alive = np.ones(len(self.edges), dtype=bool)
+        self.adj = graph_cal.adj_matrix(self.num_v, self.edges) if self.num_v <= graph_cal.MAX_DENSE_V else None
+        self.dist = graph_cal.cal_dist_matrix(group, edges=self.edges)
+        self.attraction = graph_cal.cal_attraction(self.dist, self.edges)
+        self.closeness = graph_cal.cal_closeness(self.dist)
+        self.del_eids = []  # deleted edge ids
+        self.adds = []  # [(g_v_idx, out_attraction)]
+        self.journal = []
+
+    @classmethod
+    def of_ops(cls, group: ig.Graph, comm: ig.Graph, conv_rate: float, ops: list):
+        """ evaluator of the state after ops """
+        evaluator = cls(group, comm, conv_rate)
+        evaluator.set_ops(ops)
+        return evaluator
+
+    def eid(self, edge: tuple) -> int:
+        u, v = self.v_idx[edge[0]], self.v_idx[edge[1]]
+        return self.e_idx[(min(u, v), max(u, v))]
+
+    def out_attraction(self, c_v_name: str) -> float:
+        return self.c_index.out_attraction(c_v_name)
+
+    def bfs(self, sources: np.ndarray) -> np.ndarray:
+        dist = graph_cal.dense_bfs(self.adj, sources) if self.adj is not None else None
+        return graph_cal.sparse_bfs(self.num_v, self.edges[self.alive], sources) if dist is None else dist
+
+    def toggle_edge(self, eid: int, alive: bool):
+        """ del or restore an edge and update only the bfs sources whose distances may change """
+        u, v = self.edges[eid]
+        with np.errstate(invalid='ignore'):
+            gap = np.abs(self.dist[:, u] - self.dist[:, v])
+        gap[np.isnan(gap)] = 0  # both ends unreachable
+        affected = np.flatnonzero(gap == 1 if not alive else gap > 1)
+        self.journal.append(('edge', eid, affected, self.dist[affected], self.attraction.copy(),
+                             self.closeness.copy()))
+        # unaffected sources keep their distances and only gain or lose the weight of this edge
+        weight = graph_cal.INIT_WEIGHT * np.power(BASE_WEIGHT, np.minimum(self.dist[:, u], self.dist[:, v]))
+        self.attraction += weight if alive else -weight
+        self.alive[eid] = alive
+        if alive:
+            self.del_eids.remove(eid)
+        else:
+            self.del_eids.append(eid)
+        if self.adj is not None:
+            self.adj[u, v] = self.adj[v, u] = alive
+        if len(affected):
+            self.dist[affected] = self.bfs(affected)
+            self.attraction[affected] = graph_cal.cal_attraction(self.dist[affected], self.edges[self.alive])
+            self.closeness[affected] = graph_cal.cal_closeness(self.dist[affected])
+
+    def apply(self, op: tuple):
+        """ apply an op on current state """
+        if op[0] == 'del':
+            self.toggle_edge(self.eid(op[1]), False)
+        else:
+            self.adds.append((self.v_idx[op[1][0]], self.out_attraction(op[1][1])))
+            self.journal.append(('add', len(self.adds) - 1))
+
+    def remove(self, op: tuple):
+        """ revoke an op applied before (not necessarily the last one) """
+        if op[0] == 'del':
+            self.toggle_edge(self.eid(op[1]), True)
+        else:
+            add = (self.v_idx[op[1][0]], self.out_attraction(op[1][1]))
+            pos = self.adds.index(add)
+            self.adds.pop(pos)
+            self.journal.append(('remove', pos, add))
+
+    def checkpoint(self) -> int:
+        return len(self.journal)
+
+    def rollback(self, checkpoint: int = 0):
+        """ undo all changes after checkpoint """
+        while len(self.journal) > checkpoint:
+            entry = self.journal.pop()
+            if entry[0] == 'edge':
+                _, eid, affected, dist_rows, self.attraction, self.closeness = entry
+                alive = not self.alive[eid]
+                self.alive[eid] = alive
+                if alive:
+                    self.del_eids.remove(eid)
+                else:
+                    self.del_eids.append(eid)
+                if self.adj is not None:
+                    u, v = self.edges[eid]
+                    self.adj[u, v] = self.adj[v, u] = alive
+                self.dist[affected] = dist_rows
+            elif entry[0] == 'add':
+                self.adds.pop(entry[1])
+            else:
+                self.adds.insert(entry[1], entry[2])
+
+    def commit(self):
+        """ accept current state, drop the journal """
+        self.journal.clear()
+
+    def set_ops(self, ops: list):
+        """ move to the state after ops, only touching the edges that differ from current state """
+        del_eids = list(dict.fromkeys([self.eid(op[1]) for op in ops if op[0] == 'del']))
+        for eid in [_ for _ in self.del_eids if _ not in del_eids]:
+            self.toggle_edge(eid, True)
+        for eid in [_ for _ in del_eids if _ not in self.del_eids]:
+            self.toggle_edge(eid, False)
+        self.adds = [(self.v_idx[op[1][0]], self.out_attraction(op[1][1])) for op in ops if op[0] == 'add']
+        self.commit()
+
+    def is_connected(self) -> bool:
+        return bool(np.isfinite(self.dist[0]).all())
+
+    def out_score(self) -> float:
+        return sum([out_attraction / self.attraction[g_v_idx] for g_v_idx, out_attraction in self.adds])
+
+    def score(self) -> float:
+        """ out score + in score (safeness) + conv_rate * convenience of current state """
+        in_score = graph_cal.norm_safeness(self.attraction.mean(), self.num_v)
+        return self.out_score() + in_score + self.conv_rate * self.closeness.mean()
+
+    def delta(self, op: tuple) -> float:
+        """ score gain of applying op on current state (state is unchanged) """
+        pre_score = self.score()
+        checkpoint = self.checkpoint()
+        self.apply(op)
+        gain = self.score() - pre_score
+        self.rollback(checkpoint)
+        return gain
+
+
+if __name__ == '__main__':
+    c = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
+    g = graph_load.create_full_graph(5, 'g-')
+    evaluator = GroupEvaluator(g, c, 0)
+    evaluator.set_ops([('del', ('g-0', 'g-1')), ('add', ('g-0', 'c-11'))])
+    print(evaluator.score(), evaluator.delta(('del', ('g-2', 'g-3'))))
+    print("ok")
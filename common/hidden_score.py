@@ -0,0 +1,128 @@
+import time
+import numpy as np
+import igraph as ig
+from collections import namedtuple
+from common import graph_cal, graph_load
+from common.memo import LRUMemo
+from common.worker_pool import WorkerPool
+
+# g_clusters: [(num of group vertices, num of vertices)] of clusters containing group vertices
+HiddenResult = namedtuple('HiddenResult', ['g_clusters', 'hidden_score', 'num_clusters'])
+
+
+def init_worker(group: ig.Graph, comm: ig.Graph, hops: int = None, refine: bool = False) -> dict:
+    return {'group': group, 'comm': comm, 'hops': hops, 'refine': refine}
+
+
+def estimate_group_clusters(group: ig.Graph, comm: ig.Graph, ops: list, hops: int = 2, refine: bool = False) -> (
+        list, int):
+    """ like cal_group_clusters, but cluster only the hops-hop neighbourhood of group vertices after ops
+
+    added edges bring their community ends into the neighbourhood. refine=True moves vertices between the
+    clusters of leading eigenvector to raise the modularity of the neighbourhood (leiden from that membership).
+    cluster sizes are counted inside the neighbourhood, so the result is an estimate.
+    """
+    new_comm = graph_load.apply_ops(graph_load.cached_union_two_graphs(comm, group), ops)
+    g_ids = list(range(comm.vcount(), new_comm.vcount()))  # group vertices are last
+    local_ids = np.unique(np.concatenate([np.asarray(_, dtype=int) for _ in new_comm.neighborhood(g_ids, hops)]))
+    local = new_comm.induced_subgraph(local_ids.tolist())
+    membership = local.community_leading_eigenvector().membership
+    if refine:
+        membership = local.community_leiden(objective_function='modularity', initial_membership=membership,
+                                            n_iterations=2).membership
+    membership = np.array(membership)
+    sizes = np.bincount(membership)
+    in_group = np.bincount(membership[np.searchsorted(local_ids, g_ids)], minlength=len(sizes))
+    g_clusters = [(int(in_group[i]), int(sizes[i])) for i in np.flatnonzero(in_group)]
+    return g_clusters, len(sizes)
+
+
+def cal_hidden_result(state: dict, ops: tuple) -> HiddenResult:
+    group, comm = state['group'], state['comm']
+    if state['hops'] is None:
+        g_clusters, num_clusters = graph_cal.cal_group_clusters(group, comm, list(ops))
+    else:
+        g_clusters, num_clusters = estimate_group_clusters(group, comm, list(ops), state['hops'], state['refine'])
+    return HiddenResult(g_clusters, graph_cal.hidden_score_of_clusters(g_clusters, group.vcount()), num_clusters)
+
+
+def rank_corr(x: np.ndarray, y: np.ndarray) -> float:
+    """ spearman correlation (ties ranked by order) """
+    rank_x, rank_y = np.argsort(np.argsort(x)), np.argsort(np.argsort(y))
+    return float(np.corrcoef(rank_x, rank_y)[0, 1]) if len(x) > 1 else 1.0
+
+
+def calibrate(group: ig.Graph, comm: ig.Graph, ops_list: list, hops: int = 2, refine: bool = False) -> dict:
+    """ agreement and time of estimated hidden scores against exact ones on the op sets of ops_list """
+    num_g_v, exact, estimate, exact_time, estimate_time = group.vcount(), [], [], 0, 0
+    for ops in ops_list:
+        start_time = time.perf_counter()
+        exact.append(graph_cal.hidden_score_of_clusters(graph_cal.cal_group_clusters(group, comm, ops)[0], num_g_v))
+        exact_time += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        estimate.append(graph_cal.hidden_score_of_clusters(
+            estimate_group_clusters(group, comm, ops, hops, refine)[0], num_g_v))
+        estimate_time += time.perf_counter() - start_time
+    err = np.abs(np.array(exact) - np.array(estimate))
+    return {'samples': len(ops_list), 'hops': hops, 'refine': refine, 'mean_abs_err': float(err.mean()),
+            'max_abs_err': float(err.max()), 'rank_corr': rank_corr(np.array(exact), np.array(estimate)),
+            'exact_time': exact_time, 'estimate_time': estimate_time}
+
+
+class HiddenScoreEvaluator:
+    """ hidden scores of op sets on (group, community), memoized by canonical op set """
+
+    def __init__(self, group: ig.Graph, comm: ig.Graph, processes: int = 1, cache_size: int = 1 << 12,
+                 hops: int = None, refine: bool = False):
+        self.group = group
+        self.comm = comm
+        self.processes = processes
+        self.hops = hops  # estimate on the hops-hop neighbourhood of group if given, else exact
+        self.refine = refine
+        self.cache = LRUMemo(cache_size)
+        self.pool = None  # started by the first batch with several misses, reused until close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    @staticmethod
+    def ops_key(ops) -> tuple:
+        """ same key for op sets in any order or edge direction (repeated ops are kept) """
+        return tuple(sorted([(op[0], tuple(sorted(op[1]))) for op in ops]))
+
+    def score(self, ops) -> HiddenResult:
+        return self.batch_score([ops])[0]
+
+    def batch_score(self, ops_list: list) -> list:
+        """ hidden results of each op set, the missed op sets are scored once across a process pool """
+        keys = [self.ops_key(_) for _ in ops_list]
+        found = {_: self.cache.get(_) for _ in dict.fromkeys(keys)}
+        misses = [key for key, result in found.items() if result is None]
+        if self.processes == 1 or len(misses) < 2:
+            state = init_worker(self.group, self.comm, self.hops, self.refine)
+            results = [cal_hidden_result(state, _) for _ in misses]
+        else:
+            if self.pool is None:
+                self.pool = WorkerPool(self.processes, init_worker, (self.group, self.comm, self.hops, self.refine))
+            results = self.pool.map(cal_hidden_result, [(_,) for _ in misses])
+        for key, result in zip(misses, results):
+            self.cache.put(key, result)
+            found[key] = result
+        return [found[_] for _ in keys]
+
+
+if __name__ == '__main__':
+    c = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
+    g = graph_load.create_full_graph(5, 'g-')
+    ops = [('del', ('g-0', 'g-1')), ('add', ('g-0', 'c-11'))]
+    with HiddenScoreEvaluator(g, c, processes=2) as evaluator:
+        print(evaluator.batch_score([ops, ops[::-1], [('add', ('g-1', 'c-48'))]]), evaluator.cache.report())
+    print("ok")
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+class LRUMemo:
+    """ bounded memo with least recently used eviction and hit statistics """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """ get value of key and count a hit or a miss """
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+        self.misses += 1
+        return default
+
+    def peek(self, key, default=None):
+        """ get value of key without counting or refreshing it """
+        return self.data.get(key, default)
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.max_size:
+            self.data.popitem(last=False)  # evict the least recently used
+
+    def get_or_cal(self, key, cal_fun):
+        """ get value of key, or cal it by cal_fun() and memo it """
+        if key in self.data:
+            return self.get(key)
+        self.misses += 1
+        value = cal_fun()
+        self.put(key, value)
+        return value
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0
+
+    def report(self) -> dict:
+        return {'size': len(self.data), 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+
+if __name__ == '__main__':
+    memo = LRUMemo(2)
+    memo.put('a', 1)
+    memo.put('b', 2)
+    memo.get('a')
+    memo.put('c', 3)  # evict 'b'
+    print('b' in memo, memo.get_or_cal('d', lambda: 4), memo.report())
+    print("ok")
@@ -0,0 +1,135 @@
+import json
+import time
+import functools
+import igraph as ig
+from collections import defaultdict
+from common import graph_cal, graph_load
+from common.group_eval import GroupEvaluator
+from common.connectivity import ConnectivityOracle
+
+PHASES = ('init', 'disturbance', 'evaluation', 'selection', 'crossover', 'validation')
+MAIN_PHASE = 'main'  # calls outside any registered phase
+# hot calls counted and timed: (owner, attribute)
+HOT_POINTS = [(graph_cal, 'cal_dist_matrix'), (graph_cal, 'cal_group_metrics'), (graph_cal, 'cal_as_of_vertex'),
+              (graph_cal, 'cal_safeness_of_graph'), (graph_cal, 'norm_safeness'), (graph_cal, 'cal_group_clusters'),
+              (ig.Graph, 'copy'), (ig.Graph, 'is_connected'), (ig.Graph, 'community_leading_eigenvector'),
+              (graph_cal, 'dense_bfs'), (graph_cal, 'sparse_bfs'), (ConnectivityOracle, 'is_connected_after'),
+              (GroupEvaluator, 'toggle_edge'), (GroupEvaluator, 'score'), (GroupEvaluator, 'delta')]
+PHASE_POINTS = []  # [(owner, attribute, phase)] registered by the solvers
+
+
+def register_phases(owner, phases: dict):
+    """ mark methods {attribute: phase} of owner as phases of a solver """
+    for attr, phase in phases.items():
+        assert phase in PHASES, "unknown phase: {}".format(phase)
+        PHASE_POINTS.append((owner, attr, phase))
+
+
+class Profiler:
+    """ count and time hot calls per solver phase, the innermost running phase owns a call
+
+    wrappers are installed by enable() and removed by disable(), so a disabled profiler costs nothing.
+    only calls of this process are seen, run process pools with processes=1 to profile them.
+    """
+
+    def __init__(self):
+        self.phase_stack = [MAIN_PHASE]
+        self.phases = defaultdict(lambda: [0, 0.0])  # {phase: [calls, seconds]}
+        self.hot = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))  # {phase: {name: [calls, seconds]}}
+        self.originals = []  # [(owner, attribute, value in owner.__dict__ or None)]
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+
+    @staticmethod
+    def unwrap(raw):
+        """ (function, re-wrap) of a plain, static or class method """
+        if isinstance(raw, (staticmethod, classmethod)):
+            return raw.__func__, type(raw)
+        return raw, lambda f: f
+
+    def install(self, owner, attr: str, make_wrapper):
+        raw = vars(owner).get(attr)
+        fun, rewrap = self.unwrap(raw if raw is not None else getattr(owner, attr))
+        self.originals.append((owner, attr, raw))
+        setattr(owner, attr, rewrap(functools.wraps(fun)(make_wrapper(fun))))
+
+    def hot_wrapper(self, name: str):
+        def make_wrapper(fun):
+            def timed(*args, **kwargs):
+                start_time = time.perf_counter()
+                try:
+                    return fun(*args, **kwargs)
+                finally:
+                    record = self.hot[self.phase_stack[-1]][name]
+                    record[0] += 1
+                    record[1] += time.perf_counter() - start_time
+            return timed
+        return make_wrapper
+
+    def phase_wrapper(self, phase: str):
+        def make_wrapper(fun):
+            def timed(*args, **kwargs):
+                self.phase_stack.append(phase)
+                start_time = time.perf_counter()
+                try:
+                    return fun(*args, **kwargs)
+                finally:
+                    self.phase_stack.pop()
+                    if phase not in self.phase_stack:  # time of a phase nested in itself is counted once
+                        self.phases[phase][1] += time.perf_counter() - start_time
+                    self.phases[phase][0] += 1
+            return timed
+        return make_wrapper
+
+    def enable(self):
+        if len(self.originals):
+            return
+        for owner, attr in HOT_POINTS:
+            self.install(owner, attr, self.hot_wrapper("{}.{}".format(owner.__name__.split('.')[-1], attr)))
+        for owner, attr, phase in PHASE_POINTS:
+            self.install(owner, attr, self.phase_wrapper(phase))
+
+    def disable(self):
+        for owner, attr, raw in reversed(self.originals):
+            if raw is None:
+                delattr(owner, attr)  # inherited, e.g. from igraph.GraphBase
+            else:
+                setattr(owner, attr, raw)
+        self.originals = []
+
+    def reset(self):
+        self.phase_stack = [MAIN_PHASE]
+        self.phases.clear()
+        self.hot.clear()
+
+    def report(self) -> dict:
+        """ {phase: {'calls', 'time', 'hot': {name: {'calls', 'time'}}}} """
+        report = {}
+        for phase in [MAIN_PHASE] + [_ for _ in PHASES if _ in self.phases or _ in self.hot]:
+            calls, seconds = self.phases[phase] if phase in self.phases else (None, None)
+            report[phase] = {'calls': calls, 'time': seconds,
+                             'hot': {name: {'calls': record[0], 'time': record[1]}
+                                     for name, record in sorted(self.hot[phase].items())}}
+        if not len(report[MAIN_PHASE]['hot']):
+            del report[MAIN_PHASE]
+        return report
+
+    def dump(self, file_path: str):
+        with open(file_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+if __name__ == '__main__':
+    from common import profiler  # phases are registered to the imported module, not to __main__
+    from baseline.sim_anneal import SimulatedAnnealing
+    c = graph_load.load_graph_gml("../data/karate.gml", 'c-')
+    g = graph_load.create_full_graph(4, 'g-')
+    with profiler.Profiler() as prof:
+        SimulatedAnnealing(3, 0).run(g, c)
+    print(json.dumps(prof.report(), indent=2))
+    print("ok")
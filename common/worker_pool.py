@@ -0,0 +1,71 @@
+import multiprocessing as mp
+
+worker_state = {}  # state of each worker process, built once by init_worker
+
+
+def init_worker(init_fun, init_args: tuple):
+    worker_state.clear()
+    worker_state.update(init_fun(*init_args))
+
+
+def call_task(task: tuple):
+    """ run a (fun, args) task as fun(state of worker, *args) """
+    fun, args = task
+    return fun(worker_state, *args)
+
+
+class WorkerPool:
+    """ process pool whose workers build their state once by init_fun(*init_args) -> dict and run fun(state, *args)
+
+    with one process the tasks run in this process on a state of its own, so callers keep one code path.
+    exiting a with block terminates the workers like mp.Pool, close waits for them instead.
+    """
+
+    def __init__(self, processes: int, init_fun, init_args: tuple = ()):
+        self.processes = processes
+        self.pool, self.state = None, None
+        if processes == 1:
+            self.state = init_fun(*init_args)
+        else:
+            self.pool = mp.Pool(processes, initializer=init_worker, initargs=(init_fun, init_args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.terminate()
+
+    def map(self, fun, args_list) -> list:
+        if self.pool is None:
+            return [fun(self.state, *_) for _ in args_list]
+        return self.pool.map(call_task, [(fun, _) for _ in args_list])
+
+    def imap_unordered(self, fun, args_list):
+        """ results in completion order, lazily in this process """
+        if self.pool is None:
+            return (fun(self.state, *_) for _ in args_list)
+        return self.pool.imap_unordered(call_task, [(fun, _) for _ in args_list])
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def terminate(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+
+if __name__ == '__main__':
+    def offset_state(offset: int) -> dict:
+        return {'offset': offset}
+
+    def square_plus(state: dict, x: int) -> int:
+        return x * x + state['offset']
+
+    for processes in [1, 2]:
+        with WorkerPool(processes, offset_state, (1,)) as pool:
+            print(pool.map(square_plus, [(_,) for _ in range(4)]))
+    print("ok")
@@ -0,0 +1,185 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import contextlib
+import numpy as np
+import igraph as ig
+import multiprocessing as mp
+from common import graph_cal, graph_load, profiler
+from common.group_eval import GroupEvaluator
+from baseline.random_algo import RandomAlgo
+from baseline.greedy_search import GreedySearch
+from baseline.sim_anneal import SimulatedAnnealing
+from baseline.genetic_algo import GeneticAlgo
+from baseline.brute_force import BruteForce
+from baseline.fionda_algo import FlondaAlgo
+from our.multi_sim_anneal import MultiSimulatedAnnealing
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DATASETS = {'karate': 'karate.gml', 'dolphins': 'dolphins.gml', 'lesmis': 'lesmis.gml', 'football': 'football.gml',
+            'political-books': 'political-books.txt', 'facebook': 'facebook.txt',
+            'email-Eu-core': 'email-Eu-core.txt'}
+ALGOS = {
+    'random': lambda group, comm, budget, conv_rate, seed: RandomAlgo(200).run(group, comm, budget, conv_rate),
+    'greedy': lambda group, comm, budget, conv_rate, seed: GreedySearch(budget, conv_rate).run(comm, group),
+    'sim_anneal': lambda group, comm, budget, conv_rate, seed: SimulatedAnnealing(budget, conv_rate).run(group, comm),
+    'multi_sim_anneal': lambda group, comm, budget, conv_rate, seed: MultiSimulatedAnnealing(
+        budget, conv_rate, 2, processes=1, seed=seed).multi_run(group, comm)[0],
+    'genetic': lambda group, comm, budget, conv_rate, seed: GeneticAlgo(
+        pop_size=200, sel_rate=0.9, crossover_rate=0.8, mutate_rate=0.01, iter_times=20).run(
+        group, comm, budget, conv_rate)[0],
+    'brute_force': lambda group, comm, budget, conv_rate, seed: BruteForce(min(budget, 2), conv_rate).run(group, comm),
+    'flonda': lambda group, comm, budget, conv_rate, seed: FlondaAlgo(budget).run(group, comm)[0],
+}
+# objective entry points counted as evaluations: (owner, attribute)
+EVAL_POINTS = [(GroupEvaluator, 'score'), (graph_cal, 'cal_group_metrics'), (FlondaAlgo, 'g_score')]
+
+
+def load_dataset(name: str) -> ig.Graph:
+    file_path = os.path.join(DATA_DIR, DATASETS[name])
+    load = graph_load.load_graph_gml if file_path.endswith('.gml') else graph_load.load_graph_txt
+    return load(file_path, 'c-')
+
+
+def count_evals() -> list:
+    """ wrap objective entry points to count their calls, return the counter [num of calls] """
+    counter = [0]
+
+    def wrap(fun):
+        def counted(*args, **kwargs):
+            counter[0] += 1
+            return fun(*args, **kwargs)
+        return counted
+
+    for owner, attr in EVAL_POINTS:
+        setattr(owner, attr, wrap(getattr(owner, attr)))
+    return counter
+
+
+def normalize_ops(ops: list, group: ig.Graph) -> list:
+    """ ops as ('del', (g_v_name, g_v_name)) and ('add', (g_v_name, c_v_name)) """
+    g_names = set(group.vs['name'])
+    return [(op[0], tuple(op[1]) if op[0] == 'del' or op[1][0] in g_names else tuple(op[1][::-1])) for op in ops]
+
+
+def run_case(args: tuple) -> dict:
+    """ run an algorithm on a dataset in a fresh process with fixed seeds, record the error if it fails """
+    try:
+        return measure_case(*args)
+    except Exception as e:
+        return {'algo': args[0], 'dataset': args[1], 'error': repr(e)}
+
+
+def measure_case(algo: str, dataset: str, group_size: int, budget: int, conv_rate: float, seed: int,
+                 profile: bool = False) -> dict:
+    comm, group = load_dataset(dataset), graph_load.create_full_graph(group_size, 'g-')
+    counter = count_evals()
+    random.seed(seed)
+    np.random.seed(seed)
+    prof = profiler.Profiler()
+    if profile:
+        prof.enable()  # skews wall time
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # algorithms print progress
+        ops = ALGOS[algo](group.copy(), comm.copy(), budget, conv_rate, seed)
+    wall_time = time.perf_counter() - start_time
+    prof.disable()
+    num_evals = counter[0]
+    peak_mem_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kilobytes on linux
+    ops = normalize_ops(ops, group)
+    evaluator = GroupEvaluator(group, comm, conv_rate)
+    evaluator.set_ops(ops)
+    random.seed(seed)  # leading eigenvector starts from a random vector
+    _, hidden_score = graph_cal.cal_hidden_score(group, comm, ops)
+    result = {'algo': algo, 'dataset': dataset, 'ops': ops, 'objective': evaluator.score(),
+              'hidden_score': hidden_score, 'wall_time': wall_time, 'num_evals': num_evals,
+              'evals_per_sec': num_evals / wall_time if wall_time else 0, 'peak_mem_kb': peak_mem_kb}
+    if profile:
+        result['profile'] = prof.report()
+    return result
+
+
+def run_suite(algos: list, datasets: list, group_size: int, budget: int, conv_rate: float, seed: int,
+              jobs: int = 1, profile: bool = False) -> dict:
+    """ each case runs in its own spawned process, so peak memory is measured per case """
+    cases = [(a, d, group_size, budget, conv_rate, seed, profile) for d in datasets for a in algos]
+    results = {}
+    os.environ['PYTHONHASHSEED'] = str(seed)  # spawned workers iterate sets of names in the same order
+    with mp.get_context('spawn').Pool(jobs, maxtasksperchild=1) as pool:
+        for res in pool.imap(run_case, cases):
+            if 'error' in res:
+                print("{algo} on {dataset}: failed with {error}".format(**res))
+            else:
+                print("{algo} on {dataset}: objective {objective:.6f}, hidden {hidden_score:.6f}, {wall_time:.2f}s, "
+                      "{evals_per_sec:.0f} evals/s, {peak_mem_kb} KB".format(**res))
+            results["{}/{}".format(res['algo'], res['dataset'])] = res
+    meta = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+            'machine': platform.machine(), 'group_size': group_size, 'budget': budget, 'conv_rate': conv_rate,
+            'seed': seed, 'profile': profile}
+    return {'meta': meta, 'results': results}
+
+
+def compare(base: dict, new: dict, threshold: float, min_time: float = 0.5) -> list:
+    """ regressions of new against base: changed answers, or slower / bigger beyond threshold
+
+    cases shorter than min_time seconds are too noisy to compare on time.
+    """
+    regressions = []
+    for key in [_ for _ in base['results'] if _ in new['results']]:
+        b, n = base['results'][key], new['results'][key]
+        if 'error' in b or 'error' in n:
+            if 'error' in n:
+                regressions.append("{}: failed with {}".format(key, n['error']))
+            continue
+        if sorted(map(str, b['ops'])) != sorted(map(str, n['ops'])) or \
+                abs(b['objective'] - n['objective']) > 1e-9 or abs(b['hidden_score'] - n['hidden_score']) > 1e-9:
+            regressions.append("{}: answer changed, objective {} -> {}, hidden {} -> {}".format(
+                key, b['objective'], n['objective'], b['hidden_score'], n['hidden_score']))
+        if max(b['wall_time'], n['wall_time']) >= min_time:
+            if n['wall_time'] > b['wall_time'] * (1 + threshold):
+                regressions.append("{}: wall time {:.2f}s -> {:.2f}s".format(key, b['wall_time'], n['wall_time']))
+            if n['evals_per_sec'] < b['evals_per_sec'] / (1 + threshold):
+                regressions.append("{}: {:.0f} -> {:.0f} evals/s".format(key, b['evals_per_sec'],
+                                                                         n['evals_per_sec']))
+        if n['peak_mem_kb'] > b['peak_mem_kb'] * (1 + threshold):
+            regressions.append("{}: peak memory {} KB -> {} KB".format(key, b['peak_mem_kb'], n['peak_mem_kb']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="benchmark algorithms on the bundled datasets")
+    sub_parsers = parser.add_subparsers(dest='mode', required=True)
+    run_parser = sub_parsers.add_parser('run', help="run the suite and write a json baseline")
+    run_parser.add_argument('--out', default='benchmark.json')
+    run_parser.add_argument('--algos', nargs='+', default=list(ALGOS), choices=list(ALGOS))
+    run_parser.add_argument('--datasets', nargs='+', default=list(DATASETS), choices=list(DATASETS))
+    run_parser.add_argument('--group-size', type=int, default=5)
+    run_parser.add_argument('--budget', type=int, default=3)
+    run_parser.add_argument('--conv-rate', type=float, default=0)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--jobs', type=int, default=1, help="parallel cases (skews wall time)")
+    run_parser.add_argument('--profile', action='store_true', help="record hot calls per phase (skews wall time)")
+    compare_parser = sub_parsers.add_parser('compare', help="flag regressions of a run against a baseline")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.2)
+    compare_parser.add_argument('--min-time', type=float, default=0.5, help="seconds below which time is noise")
+    args = parser.parse_args()
+
+    if args.mode == 'run':
+        suite = run_suite(args.algos, args.datasets, args.group_size, args.budget, args.conv_rate, args.seed,
+                          args.jobs, args.profile)
+        with open(args.out, 'w') as f:
+            json.dump(suite, f, indent=2)
+        print("saved to {}".format(args.out))
+    else:
+        with open(args.base) as f1, open(args.new) as f2:
+            found = compare(json.load(f1), json.load(f2), args.threshold, args.min_time)
+        print("\n".join(found) if len(found) else "no regression")
+        sys.exit(1 if len(found) else 0)
@@ -0,0 +1,53 @@
+import random
+import argparse
+import numpy as np
+from common.hidden_score import calibrate
+from common.candidate_space import CandidateSpace
+from exp.benchmark import DATASETS, load_dataset
+from exp.sweep import build_pair
+
+
+def sample_ops(group, comm, budget: int, samples: int) -> list:
+    """ random allowed op sets of 1..budget ops """
+    space = CandidateSpace(group, comm, budget)
+    ops_list = []
+    for i in range(samples):
+        cids = []
+        for _ in range(1 + i % budget):
+            cids.append(space.sample_allowed(cids))
+        ops_list.append(list(space.to_ops(cids)))
+    return ops_list
+
+
+def calibrate_datasets(datasets: list, group_spec: str, budget: int, samples: int, hops_list: list,
+                       refine: bool = False, seed: int = 0) -> list:
+    """ agreement of the neighbourhood estimator with the exact hidden score on each dataset and each hops """
+    rows = []
+    for dataset in datasets:
+        random.seed(seed)
+        np.random.seed(seed)
+        comm, group = build_pair(load_dataset(dataset), group_spec)
+        ops_list = sample_ops(group, comm, budget, samples)
+        for hops in hops_list:
+            random.seed(seed)  # leading eigenvector starts from a random vector
+            rows.append(dict(dataset=dataset, **calibrate(group, comm, ops_list, hops, refine)))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="agreement of the estimated hidden score with the exact one")
+    parser.add_argument('--datasets', nargs='+', default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument('--group', default='full-5', help="full-k, star-k, tree-children-depth, sub-i")
+    parser.add_argument('--budget', type=int, default=6)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--hops', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--refine', action='store_true', help="refine local clusters by modularity")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for row in calibrate_datasets(args.datasets, args.group, args.budget, args.samples, args.hops, args.refine,
+                                  args.seed):
+        print("{dataset} hops {hops}: mean abs err {mean_abs_err:.4f}, max abs err {max_abs_err:.4f}, "
+              "rank corr {rank_corr:.3f}, speedup {speedup:.1f}x".format(
+                speedup=row['exact_time'] / max(row['estimate_time'], 1e-9), **row))
+    print("ok")
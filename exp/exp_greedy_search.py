@@ -1,42 +1,34 @@
-import igraph as ig
-import multiprocessing as mp
+import random
 from common import graph_load, graph_cal
 from common.constant import INF_BUDGET
-from baseline.greedy_search import GreedySearch
+from exp.sweep import run_sweep, load_dataset
 
 
-def exp_this_method(comm: ig.Graph, group: ig.Graph, budget: int, conv_rate: float):
-    greedy_search = GreedySearch(budget, conv_rate)
-    ops = greedy_search.run(comm.copy(), group.copy())
-    print("budget {}, conv rate {}: {} {}".format(len(ops), conv_rate,
-                                                  *graph_cal.cal_hidden_score(group.copy(), comm.copy(), ops)))
+def diff_budget(dataset: str, group: str, conv_rate: float, timeout: float = None):
+    run_sweep("greedy_search.jsonl", [dataset], [group], ['greedy'], range(1, 30), [conv_rate], timeout=timeout)
 
 
-def diff_budget(comm: ig.Graph, group: ig.Graph, conv_rate: float):
-    pool = mp.Pool(5)
-    pool.starmap(exp_this_method, [(comm, group, _, conv_rate) for _ in range(1, 30)])
+def diff_conv_rate(dataset: str, group: str, budget: int, timeout: float = None):
+    run_sweep("greedy_search.jsonl", [dataset], [group], ['greedy'], [budget], [0, 1, 5, 10, 20, 50],
+              timeout=timeout)
 
 
-def diff_conv_rate(comm: ig.Graph, group: ig.Graph, budget: int):
-    pool = mp.Pool(5)
-    pool.starmap(exp_this_method, [(comm, group, budget, _) for _ in [0, 1, 5, 10, 20, 50]])
-
-
-def diff_subs(comm: ig.Graph):
-    subs = graph_cal.gen_groups_of_graph(comm)  # subs
-    for sub in subs:
+def diff_subs(dataset: str):
+    random.seed(0)  # same clusters as the 'sub-i' groups of sweep cells with seed 0
+    subs = graph_cal.gen_groups_of_graph(load_dataset(dataset))  # subs
+    for i, sub in enumerate(subs):
         sub_comm, sub_group = sub
         print("+++++++ comm:({}, {}) group:({}, {})".format(sub_comm.vcount(), sub_comm.ecount(),
                                                             sub_group.vcount(), sub_group.ecount()))
         if 0.1 * sub_comm.vcount() < sub_group.vcount() < 0.3 * sub_comm.vcount():
-            diff_budget(sub_comm, sub_group, conv_rate=0)
-            # diff_conv_rate(comm, sub_group, budget=10)
+            diff_budget(dataset, 'sub-{}'.format(i), conv_rate=0)
+            # diff_conv_rate(dataset, 'sub-{}'.format(i), budget=10)
 
 
 if __name__ == '__main__':
     lesmis = graph_load.load_graph_gml("../data/lesmis.gml", 'c-')
     k_graph = graph_load.create_full_graph(4, 'g-')  # complete graph
-    # diff_budget(lesmis, k_graph, conv_rate=0)  # 1. diff budget
-    # diff_conv_rate(lesmis, k_graph, budget=6)  # 2. diff conv rate
-    # diff_subs(lesmis)
+    # diff_budget('lesmis', 'full-4', conv_rate=0)  # 1. diff budget
+    # diff_conv_rate('lesmis', 'full-4', budget=6)  # 2. diff conv rate
+    # diff_subs('lesmis')
     print("ok")
@@ -0,0 +1,219 @@
+import io
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from common import graph_cal
+from common.memo import LRUMemo
+from common.comm_index import CommunityIndex
+from baseline.sim_anneal import SimulatedAnnealing
+from exp.sweep import SOLVERS, build_pair, parse_spec
+from exp.benchmark import DATASETS, load_dataset
+
+# a job: {'dataset', 'group', 'algo', 'budget', 'conv_rate', 'seed', 'deadline'}, group and algo are specs of sweep
+JOB_FIELDS = ('dataset', 'group', 'algo', 'budget', 'conv_rate', 'seed')
+DEADLINE_SHARE = 0.8  # share of the deadline given to an anytime solver
+
+worker_comms = {}  # {dataset: community} of each worker process, kept resident
+worker_pairs = {}  # {(dataset, group spec, seed of 'sub-i' clusters): (community, group)}
+
+
+def init_worker(datasets: list):
+    """ load datasets and build their community indexes once in each worker """
+    for dataset in datasets:
+        worker_comms[dataset] = load_dataset(dataset)
+        CommunityIndex.of(worker_comms[dataset]).top_k(64)
+
+
+def worker_pair(dataset: str, group_spec: str, seed: int) -> tuple:
+    """ pairs of a dataset share its resident community, except 'sub-i' pairs that cut the dataset
+
+    clusters of 'sub-i' depend on the seed, so they are built from the seed of the job and cached by it.
+    """
+    key = (dataset, group_spec, seed if parse_spec(group_spec)[0] == 'sub' else None)
+    if key not in worker_pairs:
+        if dataset not in worker_comms:
+            worker_comms[dataset] = load_dataset(dataset)
+        random.seed(seed)  # leading eigenvector starts from a random vector
+        worker_pairs[key] = build_pair(worker_comms[dataset], group_spec)
+    return worker_pairs[key]
+
+
+def warm_up() -> int:
+    return os.getpid()
+
+
+def run_job(job: dict) -> dict:
+    """ solve a job on the resident graphs of worker, return its result """
+    comm, group = worker_pair(job['dataset'], job['group'], job['seed'])
+    random.seed(job['seed'])  # after the pair, so a cached pair leaves the same random state
+    np.random.seed(job['seed'])
+    name, args = parse_spec(job['algo'])
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # solvers print progress
+        if name == 'sim_anneal' and job.get('deadline'):  # anytime mode, leaving time for the hidden score
+            ops = SimulatedAnnealing(job['budget'], job['conv_rate'],
+                                     time_limit=DEADLINE_SHARE * job['deadline']).run(group.copy(), comm)
+        else:
+            # solvers may change group, never comm: the resident comm keeps its cached index
+            ops = SOLVERS[name](group.copy(), comm, job['budget'], job['conv_rate'], job['seed'], *args)
+    wall_time = time.perf_counter() - start_time
+    random.seed(job['seed'])  # leading eigenvector starts from a random vector
+    g_clusters, hidden_score = graph_cal.cal_hidden_score(group, comm, list(ops))
+    return {'status': 'done', 'ops': [[op[0], list(op[1])] for op in ops], 'g_clusters': g_clusters,
+            'hidden_score': hidden_score, 'wall_time': wall_time}
+
+
+class PlanService:
+    """ penetration planning jobs on a warm process pool, over json lines on a unix socket or tcp
+
+    identical jobs in flight share one run, finished results are memoized. a job past its deadline is answered
+    with 'timeout', its run still finishes in the pool and is cached.
+    """
+
+    def __init__(self, datasets: list, processes: int = None, cache_size: int = 1 << 12):
+        self.datasets = datasets
+        self.processes = processes if processes else os.cpu_count()
+        self.executor = None
+        self.results = LRUMemo(cache_size)  # {job key: result}
+        self.in_flight = {}  # {job key: future of its result}
+        self.num_jobs = 0
+        self.num_shared = 0  # jobs answered by a run in flight
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(self.processes, initializer=init_worker, initargs=(self.datasets,))
+        await asyncio.gather(*[loop.run_in_executor(self.executor, warm_up) for _ in range(self.processes)])
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def job_key(job: dict) -> tuple:
+        """ deadline only changes the answer of anytime solvers """
+        deadline = job.get('deadline') if parse_spec(job['algo'])[0] == 'sim_anneal' else None
+        return tuple([job[_] for _ in JOB_FIELDS]) + (deadline,)
+
+    @staticmethod
+    def check_job(job: dict) -> dict:
+        job = dict({'conv_rate': 0, 'seed': 0, 'deadline': None}, **job)
+        if job.get('dataset') not in DATASETS:
+            raise ValueError("unknown dataset: {}".format(job.get('dataset')))
+        if parse_spec(job.get('algo', ''))[0] not in SOLVERS:
+            raise ValueError("unknown algo: {}".format(job.get('algo')))
+        parse_spec(job.get('group', ''))
+        job['budget'], job['conv_rate'], job['seed'] = int(job['budget']), float(job['conv_rate']), int(job['seed'])
+        return job
+
+    async def submit(self, job: dict) -> dict:
+        job = self.check_job(job)
+        key = self.job_key(job)
+        self.num_jobs += 1
+        result = self.results.get(key)
+        if result is not None:
+            return dict(result, cached=True)
+        future = self.in_flight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, run_job, job)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda f: self.finish(key, f))
+        else:
+            self.num_shared += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), job['deadline'])
+        except asyncio.TimeoutError:
+            return {'status': 'timeout', 'error': "over {}s".format(job['deadline'])}
+        return dict(result, cached=False)
+
+    def finish(self, key: tuple, future):
+        del self.in_flight[key]
+        if not future.cancelled() and future.exception() is None:
+            self.results.put(key, future.result())
+
+    def report(self) -> dict:
+        return {'jobs': self.num_jobs, 'shared': self.num_shared, 'in_flight': len(self.in_flight),
+                'cache': self.results.report()}
+
+    async def answer(self, request: dict) -> dict:
+        try:
+            if request.get('op') == 'stats':
+                response = self.report()
+            else:
+                response = await self.submit(request['job'])
+        except Exception as e:  # bad job, or solver failed in the pool
+            response = {'status': 'error', 'error': repr(e)}
+        return dict(response, id=request.get('id'))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ a request per line: {'id', 'op': 'plan' or 'stats', 'job'}, responses in order of completion """
+        lock, tasks = asyncio.Lock(), set()
+
+        async def respond(request: dict):
+            response = await self.answer(request)
+            async with lock:
+                writer.write((json.dumps(response) + '\n').encode())
+                await writer.drain()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = {'op': 'plan', 'job': None}  # answered with an error
+            task = asyncio.create_task(respond(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        writer.close()
+
+    async def serve(self, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765):
+        await self.start()
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        print("serving on {}".format(socket_path if socket_path else "{}:{}".format(host, port)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+
+async def request_plans(jobs: list, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765) -> list:
+    """ client: send jobs to a running service, return the responses in the order of jobs """
+    if socket_path is not None:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    for i, job in enumerate(jobs):
+        writer.write((json.dumps({'id': i, 'op': 'plan', 'job': job}) + '\n').encode())
+    await writer.drain()
+    responses = [None] * len(jobs)
+    for _ in range(len(jobs)):
+        response = json.loads(await reader.readline())
+        responses[response['id']] = response
+    writer.close()
+    return responses
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="local service of penetration planning jobs")
+    parser.add_argument('--socket', default=None, help="unix socket path, tcp if not given")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--datasets', nargs='+', default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument('--processes', type=int, default=None, help="default: num of cpus")
+    parser.add_argument('--cache-size', type=int, default=1 << 12)
+    args = parser.parse_args()
+
+    service = PlanService(args.datasets, args.processes, args.cache_size)
+    asyncio.run(service.serve(args.socket, args.host, args.port))
+    # print(asyncio.run(request_plans([{'dataset': 'lesmis', 'group': 'full-5', 'algo': 'greedy', 'budget': 4}])))
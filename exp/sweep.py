@@ -0,0 +1,231 @@
+import io
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+import contextlib
+import numpy as np
+import igraph as ig
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from collections import namedtuple
+from common import graph_cal, graph_load
+from baseline.random_algo import RandomAlgo
+from baseline.greedy_search import GreedySearch
+from baseline.sim_anneal import SimulatedAnnealing
+from baseline.genetic_algo import GeneticAlgo, IslandGeneticAlgo
+from baseline.brute_force import BruteForce
+from baseline.fionda_algo import FlondaAlgo
+from our.multi_sim_anneal import MultiSimulatedAnnealing
+from exp.benchmark import DATA_DIR, DATASETS, load_dataset
+
+# a cell of the grid, group and algo are specs as 'name-arg-arg', e.g. 'full-5', 'tree-2-3', 'multi_sim_anneal-3'
+Cell = namedtuple('Cell', ['dataset', 'group', 'algo', 'budget', 'conv_rate', 'seed'])
+SOLVERS = {
+    'random': lambda group, comm, budget, conv_rate, seed, pop_size=10000: RandomAlgo(pop_size).run(
+        group, comm, budget, conv_rate),
+    'greedy': lambda group, comm, budget, conv_rate, seed: GreedySearch(budget, conv_rate).run(comm, group),
+    'sim_anneal': lambda group, comm, budget, conv_rate, seed: SimulatedAnnealing(budget, conv_rate).run(group, comm),
+    'multi_sim_anneal': lambda group, comm, budget, conv_rate, seed, multi=5: MultiSimulatedAnnealing(
+        budget, conv_rate, multi, processes=1, seed=seed).multi_run(group, comm)[0],
+    'genetic': lambda group, comm, budget, conv_rate, seed, pop_size=10000, iter_times=100: GeneticAlgo(
+        pop_size=pop_size, sel_rate=0.9, crossover_rate=0.8, mutate_rate=0.01, iter_times=iter_times).run(
+        group, comm, budget, conv_rate)[0],
+    'island_genetic': lambda group, comm, budget, conv_rate, seed, islands=4, pop_size=10000, iter_times=100:
+    IslandGeneticAlgo(pop_size=pop_size, sel_rate=0.9, crossover_rate=0.8, mutate_rate=0.01, iter_times=iter_times,
+                      islands=islands, seed=seed).run(group, comm, budget, conv_rate)[0],
+    'brute_force': lambda group, comm, budget, conv_rate, seed: BruteForce(budget, conv_rate).run(group, comm),
+    'flonda': lambda group, comm, budget, conv_rate, seed: FlondaAlgo(budget).run(group, comm)[0],
+}
+# relative cost of a solver call, used to start the longest jobs first
+SOLVER_COST = {'random': 1, 'greedy': 1, 'flonda': 1, 'sim_anneal': 20, 'multi_sim_anneal': 20, 'genetic': 50,
+               'island_genetic': 50, 'brute_force': 1}
+
+
+def parse_spec(spec: str) -> (str, list):
+    """ 'tree-2-3' -> ('tree', [2, 3]) """
+    name, *args = spec.split('-')
+    return name, [int(_) for _ in args]
+
+
+def build_graphs(dataset: str, group_spec: str) -> (ig.Graph, ig.Graph):
+    """ (community, group) of a cell, 'sub-i' is the i-th cluster of dataset cut off as group """
+    return build_pair(load_dataset(dataset), group_spec)
+
+
+def build_pair(comm: ig.Graph, group_spec: str) -> (ig.Graph, ig.Graph):
+    name, args = parse_spec(group_spec)
+    if name == 'full':
+        return comm, graph_load.create_full_graph(*args, 'g-')
+    if name == 'star':
+        return comm, graph_load.create_star_graph(*args, 'g-')
+    if name == 'tree':
+        return comm, graph_load.create_multi_tree(*args, 'g-')
+    if name == 'sub':
+        return graph_cal.gen_groups_of_graph(comm)[args[0]]
+    raise ValueError("unknown group spec: {}".format(group_spec))
+
+
+def est_cost(cell: Cell) -> float:
+    """ rough relative run time of a cell: solver cost * dataset size * budget, brute force grows with budget """
+    name, args = parse_spec(cell.algo)
+    group_name, group_args = parse_spec(cell.group)
+    data_size = os.path.getsize(os.path.join(DATA_DIR, DATASETS[cell.dataset]))
+    cost = SOLVER_COST[name] * data_size * cell.budget * (args[0] if name == 'multi_sim_anneal' and args else 1)
+    if name == 'brute_force':
+        cost *= (sum(group_args) if group_name != 'sub' else 10) ** (2 * cell.budget)
+    return cost
+
+
+def cell_key(cell: Cell) -> str:
+    return '/'.join(map(str, cell))
+
+
+def expand_grid(datasets: list, groups: list, algos: list, budgets: list, conv_rates: list, seeds: list) -> list:
+    return [Cell(d, g, a, int(b), float(r), int(s))  # same key for 0 and 0.0 across runs
+            for d, g, a, b, r, s in itertools.product(datasets, groups, algos, budgets, conv_rates, seeds)]
+
+
+def run_cell(cell: Cell) -> dict:
+    """ run a cell with fixed seeds, return its record """
+    random.seed(cell.seed)
+    np.random.seed(cell.seed)
+    comm, group = build_graphs(cell.dataset, cell.group)  # clusters of 'sub-i' depend on the seed
+    name, args = parse_spec(cell.algo)
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # solvers print progress
+        ops = SOLVERS[name](group.copy(), comm.copy(), cell.budget, cell.conv_rate, cell.seed, *args)
+    wall_time = time.perf_counter() - start_time
+    random.seed(cell.seed)  # leading eigenvector starts from a random vector
+    g_clusters, hidden_score = graph_cal.cal_hidden_score(group, comm, list(ops))
+    return {'status': 'done', 'ops': [[op[0], list(op[1])] for op in ops], 'g_clusters': g_clusters,
+            'hidden_score': hidden_score, 'wall_time': wall_time}
+
+
+def cell_worker(cell: Cell, conn):
+    try:
+        conn.send(run_cell(cell))
+    except Exception as e:
+        conn.send({'status': 'error', 'error': repr(e)})
+    conn.close()
+
+
+class ResultStore:
+    """ finished cells appended as json lines, flushed to disk one by one so a crash loses no finished cell """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.records = {}  # {cell key: record}
+        if os.path.exists(file_path):
+            with open(file_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # line cut by a crash
+                        continue
+                    self.records[record['key']] = record
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def put(self, cell: Cell, record: dict):
+        record = dict(key=cell_key(cell), **cell._asdict(), **record)
+        self.records[record['key']] = record
+        with open(self.file_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def done(self, retry_failed: bool = False) -> set:
+        """ keys of cells to skip, failed and timed out cells are skipped unless retry_failed """
+        return {k for k, r in self.records.items() if not retry_failed or r['status'] == 'done'}
+
+
+class SweepScheduler:
+    """ run cells in worker processes, longest estimated first, skipping cells already in the store
+
+    each cell has its own process, so a cell running over timeout seconds is terminated and recorded as 'timeout'.
+    """
+
+    def __init__(self, store: ResultStore, processes: int = None, timeout: float = None):
+        self.store = store
+        self.processes = processes if processes else os.cpu_count()
+        self.timeout = timeout
+
+    def start(self, cell: Cell) -> tuple:
+        recv_conn, send_conn = mp.Pipe(duplex=False)
+        # not daemonic: solvers may start processes of their own (island genetic algo)
+        process = mp.Process(target=cell_worker, args=(cell, send_conn))
+        process.start()
+        send_conn.close()  # recv raises EOFError if the worker dies without a result
+        return process, recv_conn, time.monotonic()
+
+    def finish(self, cell: Cell, record: dict):
+        self.store.put(cell, record)
+        if record['status'] == 'done':
+            print("{}: hidden score {:.6f}, {:.2f}s".format(cell_key(cell), record['hidden_score'],
+                                                            record['wall_time']))
+        else:
+            print("{}: {} {}".format(cell_key(cell), record['status'], record.get('error', '')))
+
+    def run(self, cells: list, retry_failed: bool = False) -> dict:
+        """ run the unfinished cells, return {cell key: record} of all cells """
+        done = self.store.done(retry_failed)
+        pending = sorted([_ for _ in dict.fromkeys(cells) if cell_key(_) not in done], key=est_cost)
+        print("{} cells, {} finished before, {} to run".format(len(set(cells)), len(set(cells)) - len(pending),
+                                                             len(pending)))
+        running = {}  # {recv conn: (cell, process, start time)}
+        while len(pending) or len(running):
+            while len(pending) and len(running) < self.processes:
+                cell = pending.pop()  # longest first
+                process, conn, start_time = self.start(cell)
+                running[conn] = (cell, process, start_time)
+            deadlines = [_[2] + self.timeout for _ in running.values()] if self.timeout else []
+            wait(list(running), timeout=max(0, min(deadlines) - time.monotonic()) if len(deadlines) else None)
+            for conn, (cell, process, start_time) in list(running.items()):
+                if conn.poll():
+                    try:
+                        record = conn.recv()
+                    except EOFError:
+                        process.join()  # exitcode is set once joined
+                        record = {'status': 'error', 'error': "worker exited with {}".format(process.exitcode)}
+                elif self.timeout and time.monotonic() - start_time > self.timeout:
+                    process.terminate()
+                    record = {'status': 'timeout', 'error': "over {}s".format(self.timeout)}
+                else:
+                    continue
+                process.join()
+                conn.close()
+                del running[conn]
+                self.finish(cell, record)
+        keys = {cell_key(_) for _ in cells}
+        return {k: r for k, r in self.store.records.items() if k in keys}
+
+
+def run_sweep(store_path: str, datasets: list, groups: list, algos: list, budgets: list, conv_rates: list,
+              seeds: list = (0,), processes: int = None, timeout: float = None, retry_failed: bool = False) -> dict:
+    cells = expand_grid(datasets, groups, algos, budgets, conv_rates, seeds)
+    return SweepScheduler(ResultStore(store_path), processes, timeout).run(cells, retry_failed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="resumable parameter sweep over the bundled datasets")
+    parser.add_argument('--store', default='sweep.jsonl', help="json lines of finished cells, reused on rerun")
+    parser.add_argument('--datasets', nargs='+', default=['lesmis'], choices=list(DATASETS))
+    parser.add_argument('--groups', nargs='+', default=['full-5'], help="full-k, star-k, tree-children-depth, sub-i")
+    parser.add_argument('--algos', nargs='+', default=['greedy'], help="solver name, e.g. multi_sim_anneal-3")
+    parser.add_argument('--budgets', nargs='+', type=int, default=list(range(1, 7)))
+    parser.add_argument('--conv-rates', nargs='+', type=float, default=[0])
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0])
+    parser.add_argument('--processes', type=int, default=None, help="default: num of cpus")
+    parser.add_argument('--timeout', type=float, default=None, help="seconds of a cell")
+    parser.add_argument('--retry-failed', action='store_true', help="rerun failed and timed out cells")
+    args = parser.parse_args()
+    for algo in args.algos:
+        assert parse_spec(algo)[0] in SOLVERS, "unknown algo: {}".format(algo)
+
+    run_sweep(args.store, args.datasets, args.groups, args.algos, args.budgets, args.conv_rates, args.seeds,
+              args.processes, args.timeout, args.retry_failed)
+    print("ok")
@@ -1,23 +1,60 @@
+import os
+import random
+import numpy as np
 import igraph as ig
-from common import graph_cal, graph_load
+from common import graph_load, profiler
+from common.hidden_score import HiddenScoreEvaluator
+from common.worker_pool import WorkerPool
 from baseline.sim_anneal import SimulatedAnnealing
 
+def init_worker(group: ig.Graph, comm: ig.Graph) -> dict:
+    # chains ending with the same ops are scored once
+    return {'group': group, 'comm': comm, 'hidden': HiddenScoreEvaluator(group, comm)}
+
+
+def run_chain(state: dict, chain: int, budget: int, conv_rate: float, seed: int) -> (int, list, float, float):
+    """ run an annealing chain in worker with its own seed, return (chain, ops, obj score, hidden score) """
+    random.seed(seed)
+    np.random.seed(seed)
+    group, comm = state['group'], state['comm']
+    sim_ann = SimulatedAnnealing(budget, conv_rate)
+    ops = sim_ann.run(group, comm)
+    return chain, ops, -sim_ann.obj_fun(ops, group, comm), state['hidden'].score(ops).hidden_score
+
 
 class MultiSimulatedAnnealing:
-    def __init__(self, budget: int, conv_rate: float, multi: int):
+    def __init__(self, budget: int, conv_rate: float, multi: int, processes: int = None, seed: int = None,
+                 target_score: float = None):
         self.budget = budget
         self.conv_rate = conv_rate
         self.multi = multi
+        self.processes = processes if processes else min(multi, os.cpu_count())
+        self.seed = seed
+        self.target_score = target_score  # stop remaining chains once a hidden score reaches it
+
+    def select_best(self, results) -> (list, float, float):
+        """ best chain by hidden score, then obj score, then the lower chain index, stop early once target score
+        is reached. results come in completion order, so only an early stop depends on which chains finish first.
+        """
+        best, best_rank = (None, 0, -1), None
+        for chain, ops, obj_score, hidden_score in results:
+            print("chain {}: {}\nobj score: {}, hidden score: {}".format(chain, ops, obj_score, hidden_score))
+            rank = (hidden_score, obj_score, -chain)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = (ops, obj_score, hidden_score), rank
+            if self.target_score is not None and hidden_score >= self.target_score:
+                break
+        return best
+
+    def multi_run(self, group: ig.Graph, comm: ig.Graph) -> (list, float, float):
+        """ run chains in a process pool, return (best ops, obj score, hidden score) """
+        seeds = np.random.SeedSequence(self.seed).generate_state(self.multi).tolist()
+        args = [(i, self.budget, self.conv_rate, seed) for i, seed in enumerate(seeds)]
+        with WorkerPool(self.processes, init_worker, (group, comm)) as pool:
+            return self.select_best(pool.imap_unordered(run_chain, args))  # exit terminates remaining chains
+
 
-    def multi_run(self, group: ig.Graph, comm: ig.Graph):
-        best_hidden_score = 0
-        for i in range(self.multi):
-            sim_ann = SimulatedAnnealing(self.budget, self.conv_rate)
-            best_op = sim_ann.run(group, comm)
-            _, hidden_score = graph_cal.cal_hidden_score(group, comm, best_op)
-            if hidden_score > best_hidden_score:
-                best_hidden_score = hidden_score
-            print("iter {}:{}\n{} {}".format(i, best_op, _, hidden_score))
+profiler.register_phases(MultiSimulatedAnnealing, {'select_best': 'selection'})
 
 
 if __name__ == '__main__':
@@ -25,5 +62,5 @@ if __name__ == '__main__':
     attacker = graph_load.create_full_graph(6, 'g-')
 
     multi_sim_ann = MultiSimulatedAnnealing(4, 0, 1)
-    multi_sim_ann.multi_run(attacker.copy(), facebook.copy())
+    print(multi_sim_ann.multi_run(attacker.copy(), facebook.copy()))
     print("ok")
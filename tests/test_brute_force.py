@@ -0,0 +1,55 @@
+from itertools import combinations
+import igraph as ig
+import pytest
+from common import graph_load
+from common.candidate_space import CandidateSpace
+from common.connectivity import ConnectivityOracle
+from common.group_eval import GroupEvaluator
+from baseline.brute_force import BruteForce
+
+
+def exhaustive_best(group: ig.Graph, comm: ig.Graph, budget: int, conv_rate: float) -> float:
+    """ best score over every valid op set of budget ops in the candidate space """
+    space = CandidateSpace(group, comm, budget)
+    oracle, evaluator, best = ConnectivityOracle(group), GroupEvaluator(group, comm, conv_rate), 0
+    for cids in combinations(range(space.size), budget):
+        adds = [_ for _ in cids if _ >= space.num_del]
+        if not adds or len({space.add_g_v[_] for _ in adds}) < len(adds) or len(
+                {space.add_c_v[_] for _ in adds}) < len(adds):
+            continue
+        if not oracle.is_connected_after([_ for _ in cids if _ < space.num_del]):
+            continue
+        evaluator.set_ops(space.to_ops(cids))
+        best = max(best, evaluator.score())
+    return best
+
+
+def score_of(group: ig.Graph, comm: ig.Graph, ops: list, conv_rate: float) -> float:
+    evaluator = GroupEvaluator(group, comm, conv_rate)
+    evaluator.set_ops(ops)
+    return evaluator.score()
+
+
+def test_k4_on_ring_keeps_deletions():
+    group, comm = graph_load.create_full_graph(4, 'g-'), graph_load.name_vertices(ig.Graph.Ring(10), 'c-')
+    ops = BruteForce(5, 0).run(group, comm)
+    assert len([_ for _ in ops if _[0] == 'del']) == 3
+    assert score_of(group, comm, ops, 0) == pytest.approx(exhaustive_best(group, comm, 5, 0))
+
+
+@pytest.mark.parametrize('num_v', [4, 5])
+@pytest.mark.parametrize('budget', [1, 2, 3, 4])
+@pytest.mark.parametrize('conv_rate', [0, 1])
+def test_matches_exhaustive_on_ring(num_v: int, budget: int, conv_rate: float):
+    group, comm = graph_load.create_full_graph(num_v, 'g-'), graph_load.name_vertices(ig.Graph.Ring(12), 'c-')
+    ops = BruteForce(budget, conv_rate).run(group, comm)
+    assert score_of(group, comm, ops, conv_rate) == pytest.approx(exhaustive_best(group, comm, budget, conv_rate))
+
+
+def test_safeness_and_conv_checks_each_group():
+    comm = graph_load.name_vertices(ig.Graph.Ring(12), 'c-')
+    brute_force = BruteForce(1, 0)
+    full = graph_load.create_full_graph(4, 'g-')
+    assert brute_force.cal_safeness_and_conv((('g-0', 'g-1'),), (), full, comm) != 'unconnected'
+    line = graph_load.create_multi_tree(1, 3, 'g-')
+    assert brute_force.cal_safeness_and_conv((('g-0', 'g-1'),), (), line, comm) == 'unconnected'
@@ -0,0 +1,26 @@
+import gc
+import igraph as ig
+from common import graph_load
+from common.comm_index import CommunityIndex, index_memo
+
+
+def test_rebuilt_after_edit_keeping_size():
+    comm, group = graph_load.name_vertices(ig.Graph.Star(6), 'c-'), graph_load.create_full_graph(3, 'g-')
+    index = CommunityIndex.of(comm)
+    assert CommunityIndex.of(comm) is index and index.top_names(1) == ['c-0']
+    assert graph_load.cached_union_two_graphs(comm, group).are_connected('c-0', 'c-1')
+    graph_load.apply_ops(comm, [('del', ('c-0', 'c-1')), ('del', ('c-0', 'c-2')), ('del', ('c-0', 'c-3')),
+                                ('add', ('c-1', 'c-2')), ('add', ('c-1', 'c-3')), ('add', ('c-1', 'c-4'))])
+    assert CommunityIndex.of(comm).top_names(1) == ['c-1']
+    union = graph_load.cached_union_two_graphs(comm, group)
+    assert union.are_connected('c-1', 'c-3') and not union.are_connected('c-0', 'c-1')
+
+
+def test_dropped_with_community():
+    size = len(index_memo)
+    comm = graph_load.name_vertices(ig.Graph.Ring(6), 'c-')
+    CommunityIndex.of(comm)
+    assert len(index_memo) == size + 1
+    del comm
+    gc.collect()
+    assert len(index_memo) == size
@@ -0,0 +1,28 @@
+import random
+import igraph as ig
+import numpy as np
+import pytest
+from common import graph_load
+from common.connectivity import ConnectivityOracle
+from exp.benchmark import load_dataset
+
+
+def groups() -> list:
+    random.seed(0)  # igraph draws from the random module
+    return [graph_load.create_full_graph(6, 'g-'), graph_load.create_multi_tree(2, 3, 'g-'),
+            graph_load.create_barabasi_albert_graph(20, 2, 'g-'), load_dataset('lesmis'),
+            graph_load.name_vertices(ig.Graph.Erdos_Renyi(15, 0.2), 'g-')]
+
+
+@pytest.mark.parametrize('group', groups())
+def test_matches_deleting_from_copy(group: ig.Graph):
+    rng = np.random.default_rng(0)
+    oracle = ConnectivityOracle(group)
+    for _ in range(200):
+        size = rng.integers(0, min(group.ecount(), 8) + 1)
+        del_eids = rng.choice(group.ecount(), size, replace=False).tolist()
+        group_copy = group.copy()
+        group_copy.delete_edges(del_eids)
+        assert oracle.is_connected_after(del_eids) == group_copy.is_connected()
+        ops = [('del', (group.vs[u]['name'], group.vs[v]['name'])) for u, v in [group.es[_].tuple for _ in del_eids]]
+        assert oracle.is_connected_after_ops(ops) == group_copy.is_connected()
@@ -0,0 +1,23 @@
+from common.csr_graph import load_edge_list
+
+
+def write_edges(tmp_path, text: str) -> str:
+    file_path = tmp_path / 'edges.txt'
+    file_path.write_text(text)
+    return str(file_path)
+
+
+def edge_set(csr) -> set:
+    return {tuple(sorted((csr.ids[u], csr.ids[v]))) for u, v in csr.edge_array().tolist()}
+
+
+def test_int_ids_are_relabelled_by_value(tmp_path):
+    csr = load_edge_list(write_edges(tmp_path, "# comment\n3 1\n1 2\n2 3\n2 1\n"), chunk_lines=2)
+    assert csr.ids.tolist() == [1, 2, 3]
+    assert csr.num_v == 3 and csr.num_e == 3
+
+
+def test_mixed_ids_fall_back_to_bytes(tmp_path):
+    csr = load_edge_list(write_edges(tmp_path, "1 2\n2 3\na 1\n3 a\n4 5\n"), chunk_lines=2)
+    assert sorted(csr.ids.tolist()) == [b'1', b'2', b'3', b'4', b'5', b'a']
+    assert edge_set(csr) == {(b'1', b'2'), (b'2', b'3'), (b'1', b'a'), (b'3', b'a'), (b'4', b'5')}
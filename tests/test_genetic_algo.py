@@ -0,0 +1,14 @@
+from common import graph_load
+from baseline.genetic_algo import IslandGeneticAlgo
+from exp.benchmark import load_dataset
+
+
+def test_islands_live_through_migrations():
+    comm, group = load_dataset('lesmis'), graph_load.create_full_graph(5, 'g-')
+    island_algo = IslandGeneticAlgo(pop_size=2000, sel_rate=0.9, crossover_rate=0.8, mutate_rate=0.01,
+                                    iter_times=30, islands=2, migration_interval=10, num_migrants=5, processes=1,
+                                    seed=0)
+    ops, score = island_algo.run(group, comm, budget=4, conv_rate=0)
+    assert island_algo.epochs == 3  # no island dies out before the last epoch
+    assert island_algo.num_migrated > 0
+    assert len(ops) == 4 and score > 0
@@ -0,0 +1,58 @@
+import random
+import igraph as ig
+import pytest
+from common import graph_cal, graph_load
+from common.constant import BASE_WEIGHT
+from exp.benchmark import load_dataset
+
+
+def layered_as_of_vertex(g: ig.Graph, vertex_idx: int, weight: float = graph_cal.INIT_WEIGHT) -> float:
+    """ attraction of a connected graph to a vertex by the layer by layer search it was first defined with """
+    edges_searched, vertices_searched = set(g.incident(vertex_idx)), {vertex_idx}
+    vertices_to_search, as_of_v = g.neighbors(vertex_idx), len(edges_searched) * weight
+    while len(edges_searched) != g.ecount():
+        weight *= BASE_WEIGHT
+        next_layer_edges, next_layer_vertices = [], []
+        for v in vertices_to_search:
+            next_layer_edges.extend(g.incident(v))
+            next_layer_vertices.extend(g.neighbors(v))
+            vertices_searched.add(v)
+        as_of_v += weight * len(set(next_layer_edges) - edges_searched)
+        vertices_to_search = list(set(next_layer_vertices) - vertices_searched)
+        edges_searched |= set(next_layer_edges)
+    return as_of_v
+
+
+def layered_avg_as(g: ig.Graph, weight: float = graph_cal.INIT_WEIGHT) -> float:
+    return sum([layered_as_of_vertex(g, _, weight) for _ in range(g.vcount())]) / g.vcount()
+
+
+def connected_graphs() -> list:
+    graphs = [load_dataset('lesmis'), graph_load.create_full_graph(6, 'g-'), graph_load.create_star_graph(7, 'g-'),
+              graph_load.create_multi_tree(2, 3, 'g-'), graph_load.create_multi_tree(1, 40, 'g-')]
+    for seed in range(3):
+        random.seed(seed)  # igraph draws from the random module
+        graphs.append(graph_load.create_barabasi_albert_graph(30 + 10 * seed, 1 + seed, 'g-'))
+    return graphs
+
+
+@pytest.mark.parametrize('dense', [True, False])
+def test_fused_metrics_match_layered_search(monkeypatch, dense: bool):
+    if not dense:
+        monkeypatch.setattr(graph_cal, 'MAX_DENSE_V', 0)
+    for g in connected_graphs():
+        attraction, safeness, convenience = graph_cal.cal_group_metrics(g)
+        assert attraction == pytest.approx([layered_as_of_vertex(g, _) for _ in range(g.vcount())])
+        num_v = g.vcount()
+        min_avg_as = layered_avg_as(graph_load.create_multi_tree(1, num_v - 1, 'line-'))
+        max_avg_as = (num_v - 1) * 1 + (num_v * (num_v - 1) / 2 - (num_v - 1)) * BASE_WEIGHT
+        assert safeness == pytest.approx(1 - (layered_avg_as(g) - min_avg_as) / (max_avg_as - min_avg_as))
+        assert convenience == pytest.approx(sum(g.closeness()) / num_v)
+
+
+@pytest.mark.parametrize('num_v', list(range(3, 40)) + [64, 129])
+def test_closed_form_min_max_avg_as(num_v: int):
+    min_avg_as, max_avg_as = graph_cal.min_max_avg_as(num_v)
+    assert min_avg_as == pytest.approx(layered_avg_as(graph_load.create_multi_tree(1, num_v - 1, 'line-')))
+    # the max counts the direct edges of a complete graph with weight 1
+    assert max_avg_as == pytest.approx(layered_avg_as(graph_load.create_full_graph(num_v, 'complete-'), 1))
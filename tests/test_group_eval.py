@@ -0,0 +1,51 @@
+import random
+import numpy as np
+import pytest
+from common import graph_cal, graph_load
+from common.connectivity import ConnectivityOracle
+from common.group_eval import GroupEvaluator
+from exp.benchmark import load_dataset
+
+
+def assert_same_state(evaluator: GroupEvaluator, fresh: GroupEvaluator):
+    assert evaluator.dist == pytest.approx(fresh.dist)
+    assert evaluator.attraction == pytest.approx(fresh.attraction)
+    assert evaluator.closeness == pytest.approx(fresh.closeness)
+    assert evaluator.score() == pytest.approx(fresh.score())
+
+
+@pytest.mark.parametrize('dense', [True, False])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_incremental_matches_fresh(monkeypatch, dense: bool, seed: int):
+    if not dense:
+        monkeypatch.setattr(graph_cal, 'MAX_DENSE_V', 0)
+    random.seed(seed)  # igraph draws from the random module
+    rng = np.random.default_rng(seed)
+    comm, group = load_dataset('lesmis'), graph_load.create_barabasi_albert_graph(12, 2, 'g-')
+    oracle, evaluator = ConnectivityOracle(group), GroupEvaluator(group, comm, 1)
+    edges = [tuple(group.vs[_]['name']) for _ in group.get_edgelist()]
+    ops = []
+    for _ in range(60):
+        action = rng.integers(4)
+        if action == 0:  # apply a new op, deletions keep the group connected
+            if rng.integers(2):
+                op = ('del', edges[rng.integers(len(edges))])
+                if op in ops or not oracle.is_connected_after_ops(ops + [op]):
+                    continue
+            else:
+                op = ('add', ('g-' + str(rng.integers(group.vcount())), 'c-' + str(rng.integers(comm.vcount()))))
+            evaluator.apply(op)
+            ops.append(op)
+        elif action == 1 and ops:  # revoke any applied op
+            op = ops.pop(rng.integers(len(ops)))
+            evaluator.remove(op)
+        elif action == 2:  # try an op and roll it back
+            checkpoint = evaluator.checkpoint()
+            evaluator.apply(('add', ('g-0', 'c-0')))
+            for op in ops[:1]:
+                evaluator.remove(op)
+            evaluator.rollback(checkpoint)
+        else:  # jump to another op set
+            ops = [_ for _ in ops if rng.integers(2)]
+            evaluator.set_ops(ops)
+        assert_same_state(evaluator, GroupEvaluator.of_ops(group, comm, 1, ops))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from common import graph_load
+from common.candidate_space import CandidateSpace
+from common.connectivity import ConnectivityOracle
+from common.group_eval import GroupEvaluator
+from baseline.sim_anneal import SimulatedAnnealing
+from exp.benchmark import load_dataset
+
+
+def test_memo_hit_accept_matches_fresh_evaluator():
+    np.random.seed(0)
+    comm, group = load_dataset('lesmis'), graph_load.create_full_graph(5, 'g-')
+    sim_ann = SimulatedAnnealing(3, 1)
+    space, oracle = CandidateSpace(group, comm, 3), ConnectivityOracle(group)
+    curr_ops = sim_ann.gen_valid_ops(oracle, space)
+    evaluator = GroupEvaluator.of_ops(group, comm, 1, curr_ops)
+    curr_energy = -evaluator.score()
+    next_ops = sim_ann.disturbance(curr_ops, oracle, space)
+    sim_ann.disturbance = lambda *args: list(next_ops)
+
+    sim_ann.judge = lambda delta_energy, tmp: False  # evaluated, memoized and rejected
+    ops, energy, _ = sim_ann.anneal_step(curr_ops, curr_energy, 1, evaluator, oracle, space)
+    assert ops == curr_ops and energy == curr_energy
+    assert evaluator.score() == pytest.approx(-curr_energy)
+
+    sim_ann.judge = lambda delta_energy, tmp: True  # memo hit, accepted
+    ops, energy, _ = sim_ann.anneal_step(curr_ops, curr_energy, 1, evaluator, oracle, space)
+    fresh_score = GroupEvaluator.of_ops(group, comm, 1, next_ops).score()
+    assert ops == next_ops
+    assert energy == pytest.approx(-fresh_score)
+    assert evaluator.score() == pytest.approx(fresh_score)
+    assert sim_ann.num_evals == 1 and sim_ann.num_evals_saved == 0